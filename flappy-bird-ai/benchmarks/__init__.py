@@ -0,0 +1 @@
+__all__ = ["feedforward", "memory", "suite", "turnover"]
\ No newline at end of file
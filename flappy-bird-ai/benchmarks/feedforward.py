@@ -0,0 +1,70 @@
+"""
+Times Genome.feedforward through the compiled arrays against walking the Node objects.\n
+Run from the flappy-bird-ai directory with: python -m benchmarks.feedforward
+"""
+import argparse
+import random
+from timeit import timeit
+
+from neat.connection import InnovationHistory
+from neat.genome import Genome
+
+
+def grow_genome(mutations, innovation_hist) -> Genome:
+    """Returns a 4 input, 1 output genome after the given number of structural mutations"""
+    genome = Genome(4, 1)
+    genome.add_connection(innovation_hist)
+    for _ in range(mutations):
+        if random.random() < 0.5 and not genome.is_fully_connected():
+            genome.add_connection(innovation_hist)
+        else:
+            genome.add_node(innovation_hist)
+        for conn in genome.genes:
+            conn.mutate_weight()
+    genome.generate_network()
+    return genome
+
+
+def check_outputs(genomes, samples) -> None:
+    """Raises if the compiled outputs differ in any bit from the node walk"""
+    for g in genomes:
+        for _ in range(samples):
+            vision = [random.uniform(-1, 1) for _ in range(g.inputs)]
+            if g.feedforward(vision) != g.feedforward_nodes(vision):
+                raise AssertionError(f'compiled output differs for genome with {len(g.genes)} genes')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark compiled genome feedforward')
+    parser.add_argument('--calls', type=int, default=20000, help='feedforward calls per measurement')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    innovation_hist = InnovationHistory()
+
+    rows = []
+    for mutations in (0, 5, 20, 50):
+        genomes = [grow_genome(mutations, innovation_hist) for _ in range(10)]
+        # crossovers can carry connections the better parent's layering never delivers
+        children = []
+        for _ in range(10):
+            child = random.choice(genomes).crossover(random.choice(genomes))
+            child.generate_network()
+            children.append(child)
+        check_outputs(genomes + children, 100)
+
+        g = genomes[0]
+        vision = [0.1, 0.2, 0.3, 0.4]
+        nodes_time = timeit(lambda: g.feedforward_nodes(vision), number=args.calls)
+        compiled_time = timeit(lambda: g.feedforward(vision), number=args.calls)
+        rows.append((len(g.nodes), len(g.genes), nodes_time, compiled_time))
+
+    print(f'{"nodes":>6} {"genes":>6} {"node walk us":>13} {"compiled us":>12} {"speedup":>8}')
+    for nodes, genes, nodes_time, compiled_time in rows:
+        print(f'{nodes:>6} {genes:>6} {nodes_time / args.calls * 1e6:>13.2f} '
+              f'{compiled_time / args.calls * 1e6:>12.2f} {nodes_time / compiled_time:>7.1f}x')
+
+
+if __name__ == "__main__":
+    main()
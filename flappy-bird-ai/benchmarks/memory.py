@@ -0,0 +1,115 @@
+"""
+Measures the memory and clone time of Genome against CompactGenome for a population of grown genomes,
+then trains a population with each as Player.genome_class.\n
+Both trainings fly the same seeded course with a step cap and breed exactly the same generations, so the second
+table compares the brains training really holds and how long natural_selection takes with each.
+Run from the flappy-bird-ai directory with: python -m benchmarks.memory
+"""
+import argparse
+import io
+import random
+import tracemalloc
+from contextlib import redirect_stdout
+from time import perf_counter
+from timeit import timeit
+
+from evaluation import simulate_generation
+from player import Player
+from population import Population
+from scheduler import GenerationScheduler
+from world import World
+from neat.compact import CompactGenome
+from neat.connection import InnovationHistory
+from neat.genome import Genome
+
+
+def grow_genome(mutations, innovation_hist) -> Genome:
+    """Returns a 4 input, 1 output genome after the given number of structural mutations"""
+    genome = Genome(4, 1)
+    genome.add_connection(innovation_hist)
+    for _ in range(mutations):
+        if random.random() < 0.5 and not genome.is_fully_connected():
+            genome.add_connection(innovation_hist)
+        else:
+            genome.add_node(innovation_hist)
+    return genome
+
+
+def measure(build) -> tuple:
+    """Returns what build() returns and the bytes it left allocated"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def train(genome_class, size, generations, seed, max_steps) -> tuple:
+    """Returns the bytes the brains of population, species reps and champions hold after training and the seconds per natural_selection"""
+    random.seed(seed)
+    Genome.next_conn_num = 420
+    Player.genome_class = genome_class
+    world = World(seed=seed)
+    Player.obstacles = world.obstacles
+    scheduler = GenerationScheduler(max_steps)
+    try:
+        population = Population(size)
+        seconds = 0.0
+        for _ in range(generations):
+            world.reset(seed)
+            scheduler.start_generation()
+            simulate_generation(population, world, scheduler)
+            start = perf_counter()
+            with redirect_stdout(io.StringIO()):     # it prints every new best score
+                population.natural_selection()
+            seconds += perf_counter() - start
+
+        brains = [p.brain for p in population.players] + [s.rep for s in population.species] + \
+                 [s.champ.brain for s in population.species]
+        _, brain_bytes = measure(lambda: [b.clone() for b in brains])
+    finally:
+        Player.genome_class = Genome
+        Player.obstacles = None
+    return brain_bytes, seconds / generations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark genome memory and clone time')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 10000], help='population sizes to measure')
+    parser.add_argument('--mutations', type=int, default=5, help='structural mutations per genome')
+    parser.add_argument('--generations', type=int, default=5, help='generations to train for the training table')
+    parser.add_argument('--max-steps', type=int, default=2000, help='simulation steps a training generation may last')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    innovation_hist = InnovationHistory()
+    # a pool of grown genomes to copy from, so both representations hold the same networks
+    templates = [grow_genome(args.mutations, innovation_hist) for _ in range(50)]
+
+    print(f'{"genomes":>8} {"genes":>6} {"Genome MB":>10} {"compact MB":>11} {"ratio":>6} '
+          f'{"clone us":>9} {"compact clone us":>17}')
+    for size in args.sizes:
+        source = [templates[i % len(templates)] for i in range(size)]
+        genomes, genome_bytes = measure(lambda: [g.clone() for g in source])
+        compacts, compact_bytes = measure(lambda: [CompactGenome.from_genome(g) for g in genomes])
+
+        genes = sum(len(c.gene_inno) for c in compacts) / size
+        clone_time = timeit(lambda: [g.clone() for g in genomes], number=1)
+        compact_clone_time = timeit(lambda: [c.clone() for c in compacts], number=1)
+        print(f'{size:>8} {genes:>6.1f} {genome_bytes / 2**20:>10.2f} {compact_bytes / 2**20:>11.2f} '
+              f'{genome_bytes / compact_bytes:>5.1f}x {clone_time / size * 1e6:>9.2f} '
+              f'{compact_clone_time / size * 1e6:>17.2f}')
+
+    print()
+    print(f'{"players":>8} {"Genome MB":>10} {"compact MB":>11} {"ratio":>6} {"selection ms":>13} {"compact selection ms":>21}')
+    for size in args.sizes:
+        genome_bytes, genome_seconds = train(Genome, size, args.generations, args.seed, args.max_steps)
+        compact_bytes, compact_seconds = train(CompactGenome, size, args.generations, args.seed, args.max_steps)
+        print(f'{size:>8} {genome_bytes / 2**20:>10.2f} {compact_bytes / 2**20:>11.2f} {genome_bytes / compact_bytes:>5.1f}x '
+              f'{genome_seconds * 1e3:>13.2f} {compact_seconds * 1e3:>21.2f}')
+
+
+if __name__ == "__main__":
+    main()
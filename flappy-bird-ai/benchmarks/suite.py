@@ -0,0 +1,200 @@
+"""
+Seeded benchmarks of the NEAT and simulation hot paths at several population sizes.\n
+Prints one row per case and size, and with --json saves them so a later run can be compared with --compare.
+Run from the flappy-bird-ai directory with: python -m benchmarks.suite
+"""
+import argparse
+import io
+import json
+import platform
+import random
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from player import Player
+from population import Population
+from world import World
+from neat.connection import InnovationHistory
+from neat.genome import Genome
+from neat.species import Species
+from benchmarks.memory import grow_genome
+
+
+def best_time(setup : Callable[[], Callable[[], None]], repeat : int) -> float:
+    """Returns the quickest of repeat runs of the function setup returns, setup itself isn't timed"""
+    best = float('inf')
+    for _ in range(repeat):
+        run = setup()
+        start = perf_counter()
+        run()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def grow_genomes(n, mutations, innovation_hist) -> List[Genome]:
+    genomes = []
+    for _ in range(n):
+        g = grow_genome(mutations, innovation_hist)
+        for conn in g.genes:
+            conn.mutate_weight()
+        g.generate_network()
+        genomes.append(g)
+    return genomes
+
+
+def make_population(genomes : List[Genome], innovation_hist : InnovationHistory) -> Population:
+    """Returns a population of players with copies of genomes and made up scores, as if a generation had just ended"""
+    population = Population(0)
+    population.innovation_history = innovation_hist
+    for g in genomes:
+        p = Player(brain=g.clone())
+        p.brain.generate_network()
+        p.score = random.randint(0, 20)
+        p.lifespan = random.randint(0, 5000)
+        p.is_alive = False
+        population.players.append(p)
+    return population
+
+
+def cases(n : int, innovation_hist : InnovationHistory) -> Dict[str, tuple]:
+    """Returns name -> (setup, items timed per run) for a population of n"""
+    small = grow_genomes(n, 0, innovation_hist)
+    medium = grow_genomes(n, 5, innovation_hist)
+    large = grow_genomes(n, 20, innovation_hist)
+    vision = [0.1, 0.2, 0.3, 0.4]
+    pairs = [(random.randrange(n), random.randrange(n)) for _ in range(n)]
+
+    def feedforward(genomes):
+        def setup():
+            def run():
+                for g in genomes:
+                    g.feedforward(vision)
+            return run
+        return setup
+
+    def crossover():
+        def run():
+            for a, b in pairs:
+                medium[a].crossover(medium[b])
+        return run
+
+    def clone():
+        def run():
+            for g in medium:
+                g.clone()
+        return run
+
+    def mutate():
+        genomes = [g.clone() for g in medium]
+        def run():
+            for g in genomes:
+                g.mutate(innovation_hist)
+        return run
+
+    species = [Species(Player(brain=g.clone())) for g in medium[:10]]
+    def is_same_species():
+        def run():
+            for s in species:
+                for g in medium:
+                    s.is_same_species(g)
+        return run
+
+    speciated = make_population(medium, innovation_hist)
+    speciated.speciate()
+    def speciate():
+        return speciated.speciate
+
+    def natural_selection():
+        population = make_population(medium, innovation_hist)
+        def run():
+            with redirect_stdout(io.StringIO()):     # it prints every new best score
+                population.natural_selection()
+        return run
+
+    ticks = 20
+    def player_tick():
+        world = World(seed=n)
+        Player.obstacles = world.obstacles
+        players = [Player(brain=g) for g in medium]
+        def run():
+            for _ in range(ticks):
+                world.update(world.delta_time)
+                for p in players:
+                    if p.is_alive:
+                        p.look()
+                        p.think()
+                        p.update(world.delta_time)
+        return run
+
+    def update_alive():
+        world = World(seed=n)
+        Player.obstacles = world.obstacles
+        population = make_population(medium, innovation_hist)
+        for p in population.players:
+            p.is_alive = True
+        def run():
+            for _ in range(ticks):
+                world.update(world.delta_time)
+                population.update_alive(None, world.delta_time)
+        return run
+
+    return {
+        'feedforward small': (feedforward(small), n),
+        'feedforward medium': (feedforward(medium), n),
+        'feedforward large': (feedforward(large), n),
+        'crossover': (crossover, n),
+        'clone': (clone, n),
+        'mutate': (mutate, n),
+        'is_same_species': (is_same_species, n * len(species)),
+        'speciate': (speciate, n),
+        'natural_selection': (natural_selection, n),
+        'player tick': (player_tick, n * ticks),
+        'update_alive tick': (update_alive, n * ticks),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the NEAT and simulation hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 5000], help='population sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the quickest counts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None, help='only run cases whose name contains this')
+    parser.add_argument('--json', default=None, help='file to save the results to')
+    parser.add_argument('--compare', default=None, help='results file from an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = {(r['case'], r['n']): r['per_item_us'] for r in json.load(f)['results']}
+
+    print(f'{"case":<20} {"n":>6} {"total ms":>10} {"per item us":>12}' + (f' {"vs baseline":>12}' if baseline else ''))
+    results = []
+    for n in args.sizes:
+        random.seed(args.seed)
+        Genome.next_conn_num = 420
+        innovation_hist = InnovationHistory()
+        for name, (setup, items) in cases(n, innovation_hist).items():
+            if args.only is not None and args.only not in name:
+                continue
+            seconds = best_time(setup, args.repeat)
+            per_item = seconds / items * 1e6
+            results.append({'case': name, 'n': n, 'items': items, 'seconds': seconds, 'per_item_us': per_item})
+
+            line = f'{name:<20} {n:>6} {seconds * 1e3:>10.2f} {per_item:>12.3f}'
+            if (name, n) in baseline:
+                line += f' {per_item / baseline[(name, n)]:>11.2f}x'
+            print(line, flush=True)
+        Player.obstacles = None
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.machine(),
+                       'seed': args.seed, 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
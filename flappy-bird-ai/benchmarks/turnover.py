@@ -0,0 +1,88 @@
+"""
+Counts the objects natural_selection builds per generation with and without a PlayerPool, and how long it takes.\n
+Every generation flies the same seeded course with a step cap, so both runs breed exactly the same generations.
+Run from the flappy-bird-ai directory with: python -m benchmarks.turnover
+"""
+import argparse
+import io
+import random
+from contextlib import contextmanager, redirect_stdout
+from time import perf_counter
+from typing import Dict
+
+from evaluation import simulate_generation
+from player import Player
+from population import Population
+from scheduler import GenerationScheduler
+from world import World
+from neat.connection import ConnectionGene
+from neat.genome import Genome
+from neat.node import Node
+
+counted = (Player, Genome, Node, ConnectionGene)
+
+
+@contextmanager
+def count_constructions():
+    """Counts the instances of the counted classes made inside the with block, by class name"""
+    counts : Dict[str, int] = dict.fromkeys((cls.__name__ for cls in counted), 0)
+    originals = {cls: cls.__init__ for cls in counted}
+
+    def counting(cls, init):
+        def __init__(self, *args, **kwargs):
+            counts[cls.__name__] += 1
+            init(self, *args, **kwargs)
+        return __init__
+
+    for cls, init in originals.items():
+        cls.__init__ = counting(cls, init)
+    try:
+        yield counts
+    finally:
+        for cls, init in originals.items():
+            cls.__init__ = init
+
+
+def run(size, generations, seed, max_steps, pooled) -> tuple:
+    """Returns the objects made per generation and the seconds natural_selection took per generation"""
+    random.seed(seed)
+    Genome.next_conn_num = 420
+    world = World(seed=seed)
+    Player.obstacles = world.obstacles
+    population = Population(size)
+    if not pooled:
+        population.pool = None
+    scheduler = GenerationScheduler(max_steps)
+
+    seconds = 0.0
+    with count_constructions() as counts:
+        for _ in range(generations):
+            world.reset(seed)
+            scheduler.start_generation()
+            simulate_generation(population, world, scheduler)
+            start = perf_counter()
+            with redirect_stdout(io.StringIO()):     # it prints every new best score
+                population.natural_selection()
+            seconds += perf_counter() - start
+    Player.obstacles = None
+    return {name: n / generations for name, n in counts.items()}, seconds / generations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark object turnover between generations')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000], help='population sizes')
+    parser.add_argument('--generations', type=int, default=10)
+    parser.add_argument('--max-steps', type=int, default=2000, help='simulation steps a generation may last')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f'{"players":>8} {"pool":>5} ' + ' '.join(f'{cls.__name__:>15}' for cls in counted) + f' {"ms per gen":>11}')
+    for size in args.sizes:
+        for pooled in (False, True):
+            made, seconds = run(size, args.generations, args.seed, args.max_steps, pooled)
+            print(f'{size:>8} {"yes" if pooled else "no":>5} ' + ' '.join(f'{made[cls.__name__]:>15.1f}' for cls in counted) +
+                  f' {seconds * 1e3:>11.2f}')
+
+
+if __name__ == "__main__":
+    main()
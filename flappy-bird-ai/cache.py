@@ -0,0 +1,100 @@
+"""
+Results of genomes that already flew a course, so an unchanged genome doesn't have to fly it again.\n
+Every generation natural_selection carries over each species' champion and the previous best as unmutated clones.
+On a seeded course with a fixed step cap a bird's flight only depends on its network, so when the next generation
+flies the same course their score and lifespan can be copied from the cache instead of simulating them.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Tuple, TYPE_CHECKING
+from array import array
+import hashlib
+
+if TYPE_CHECKING:
+    from population import Population
+    from scheduler import GenerationScheduler
+    from neat.genome import Genome
+
+# reasons a generation can be cut short that depend on more than each bird's own flight
+unrepeatable = ('gen_budget', 'run_budget', 'target_score')
+
+
+def genome_key(genome : Genome) -> bytes:
+    """
+    Returns a digest of everything about genome's compiled network that affects how it flies.\n
+    Genomes that compile to the same network, e.g. a clone and its parent, get the same key.
+    """
+    if genome.compiled is None:
+        genome.generate_network()
+    net = genome.compiled
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(array('i', [net.size, net.bias, len(net.inputs), len(net.outputs), len(net.src)]).tobytes())
+    h.update(array('i', net.inputs).tobytes())
+    h.update(array('i', net.outputs).tobytes())
+    h.update(array('i', net.src).tobytes())
+    h.update(array('i', net.dst).tobytes())
+    h.update(array('d', net.weight).tobytes())
+    h.update(bytes(net.activate))
+    h.update(bytes(net.output_activate))
+    return h.digest()
+
+
+class FitnessCache():
+    """
+    Score and lifespan by (genome key, course seed, step cap), keeping the max_entries most recently used.\n
+    begin fills in the players it already knows before a generation is flown and end stores the rest afterwards.
+    """
+
+    def __init__(self, max_entries : int = 10000) -> None:
+        self.max_entries = max_entries
+        self.entries : OrderedDict[tuple, Tuple[int, int]] = OrderedDict()
+        self.pending : list = []
+        self.hits = 0
+        self.misses = 0
+        self.last_hits = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key : tuple) -> Tuple[int, int]:
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key : tuple, result : Tuple[int, int]) -> None:
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def begin(self, population : Population, course : int, max_steps : int = 0) -> int:
+        """
+        Gives every player whose network already flew course under the same step cap its old score and lifespan
+        and marks it dead, so only the others get simulated. Returns how many were found.
+        """
+        self.pending = []
+        hits = 0
+        for p in population.players:
+            key = (genome_key(p.brain), course, max_steps)
+            result = self.get(key)
+            if result is None:
+                self.pending.append((p, key))
+                continue
+            p.score, p.lifespan = result
+            p.is_alive = False
+            hits += 1
+
+        self.hits += hits
+        self.misses += len(self.pending)
+        self.last_hits = hits
+        return hits
+
+    def end(self, scheduler : GenerationScheduler = None) -> None:
+        """Stores the results of the players begin didn't find, unless the generation ended in a way that can't be repeated"""
+        pending, self.pending = self.pending, []
+        if scheduler is not None and scheduler.reason in unrepeatable:
+            return
+        for p, key in pending:
+            self.put(key, (p.score, p.lifespan))
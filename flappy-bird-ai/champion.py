@@ -0,0 +1,120 @@
+"""
+A trained bird's brain on its own: export a genome to a small file and fly it without pygame or the NEAT code.\n
+The file holds the genome's compiled network (see neat.network.CompiledNetwork) as flat little-endian arrays,
+and Champion.decide gives the same answer Player.think would for the same vision.
+Only the standard library is imported, so loading a champion takes milliseconds.
+
+Run as python champion.py champion.bin to answer a line of 4 vision values on stdin with 1 (flap) or 0.
+"""
+from __future__ import annotations
+from array import array
+from typing import List
+import math
+import struct
+import sys
+
+MAGIC = b'FBCH'
+VERSION = 1
+
+# magic, version, reserved, flap threshold, node count, bias node, input count, output count, connection count
+header_format = struct.Struct('<4sHHdiiiii')
+
+
+def export(genome, path : str, threshold : float = 0.6) -> None:
+    """Writes genome's compiled network to path, compiling it first if needed"""
+    if genome.compiled is None:
+        genome.generate_network()
+    net = genome.compiled
+
+    parts = [header_format.pack(MAGIC, VERSION, 0, threshold, net.size, net.bias,
+                                len(net.inputs), len(net.outputs), len(net.src))]
+    for typecode, values in (('i', net.inputs), ('i', net.outputs), ('i', net.src), ('i', net.dst), ('d', net.weight),
+                             ('b', net.activate), ('b', net.output_activate)):
+        values = array(typecode, values)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        parts.append(values.tobytes())
+
+    with open(path, 'wb') as f:
+        f.write(b''.join(parts))
+
+
+class Champion():
+    """A compiled network loaded from an exported champion file"""
+
+    def __init__(self, data : bytes) -> None:
+        magic, version, _, threshold, size, bias, input_count, output_count, conn_count = header_format.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError('not a champion file')
+        if version != VERSION:
+            raise ValueError(f'champion file version {version} is not supported, expected {VERSION}')
+
+        offset = header_format.size
+        def read(typecode, count):
+            nonlocal offset
+            values = array(typecode)
+            values.frombytes(data[offset:offset + count * values.itemsize])
+            if sys.byteorder == 'big':
+                values.byteswap()
+            offset += count * values.itemsize
+            return values.tolist()
+
+        self.threshold = threshold
+        self.size = size
+        self.bias = bias
+        self.inputs = read('i', input_count)
+        self.outputs = read('i', output_count)
+        src = read('i', conn_count)
+        dst = read('i', conn_count)
+        weight = read('d', conn_count)
+        activate = [bool(a) for a in read('b', conn_count)]
+        self.output_activate = [bool(a) for a in read('b', output_count)]
+        self.connections = list(zip(src, dst, weight, activate))
+
+    @classmethod
+    def load(cls, path : str) -> Champion:
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def feedforward(self, vision) -> List[float]:
+        """Same arithmetic, in the same order, as CompiledNetwork.feedforward"""
+        values = [0] * self.size
+        sums = [0] * self.size
+        for i, pos in enumerate(self.inputs):
+            values[pos] = vision[i]
+        values[self.bias] = 1
+
+        for s, d, w, act in self.connections:
+            if act:
+                values[s] = 1. / (1 + math.exp(-sums[s]))
+            sums[d] += w * values[s]
+
+        outputs = []
+        for o, act in zip(self.outputs, self.output_activate):
+            if act:
+                values[o] = 1. / (1 + math.exp(-sums[o]))
+            outputs.append(values[o])
+        return outputs
+
+    def decide(self, vision) -> bool:
+        """Returns whether the bird flaps given the 4 inputs Player.look makes"""
+        return self.feedforward(vision)[0] > self.threshold
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print('usage: python champion.py CHAMPION_FILE', file=sys.stderr)
+        return 2
+
+    champion = Champion.load(argv[0])
+    out = sys.stdout
+    for line in sys.stdin:
+        vision = [float(v) for v in line.split()]
+        out.write('1\n' if champion.decide(vision) else '0\n')
+        out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Binary checkpoints of a whole Population, so a run can be stopped and picked up again.\n
+A checkpoint is a small versioned header and directory followed by flat little-endian arrays:
+every genome is packed as a CompactGenome into shared node and gene arrays, and the players,
+species, innovation history and random module state sit in arrays of their own.
+Loading memory-maps the file and rebuilds the objects straight from those arrays.
+"""
+from __future__ import annotations
+from array import array
+from typing import Dict, List
+import gc
+import mmap
+import os
+import random
+import struct
+import numpy as np
+
+from player import Player
+from population import Population
+from neat.compact import CompactGenome
+from neat.connection import ConnectionHistory, InnovationHistory
+from neat.genome import Genome
+from neat.network import CompiledNetwork
+from neat.node import Node
+from neat.species import Species
+
+MAGIC = b'FBAI'
+VERSION = 1
+
+header_format = struct.Struct('<4sHHI')      # magic, version, reserved, number of arrays
+entry_format = struct.Struct('<16s4sQQ')     # name, dtype, length, offset from the start of the file
+
+genome_fields = 7     # inputs, outputs, layers, next_node, bias_node, node count, gene count
+network_fields = 5    # size (-1 for no network), bias, input count, output count, connection count
+
+# the CompactGenome arrays, their typecodes and their dtypes on disk
+node_fields = (('node_num', 'i', '<i4'), ('node_layer', 'i', '<i4'))
+gene_fields = (('gene_from', 'i', '<i4'), ('gene_to', 'i', '<i4'), ('gene_weight', 'd', '<f8'),
+               ('gene_enabled', 'b', 'i1'), ('gene_inno', 'q', '<i8'))
+
+
+class Checkpointer():
+    """Saves a population to path after every every-th generation"""
+
+    def __init__(self, path : str, every : int = 10) -> None:
+        self.path = path
+        self.every = max(1, every)
+
+    def generation_done(self, population : Population) -> None:
+        """Call once natural_selection has made the next generation"""
+        if (population.gen - 1) % self.every == 0:
+            save(population, self.path)
+
+
+def pack_genomes(genomes : List[Genome]) -> Dict[str, np.ndarray]:
+    """Returns the genomes as one table of sizes and their CompactGenome arrays concatenated"""
+    compacts = [g if isinstance(g, CompactGenome) else CompactGenome.from_genome(g) for g in genomes]
+    meta = np.array([(c.inputs, c.outputs, c.layers, c.next_node, c.bias_node, len(c.node_num), len(c.gene_inno))
+                     for c in compacts], dtype='<i8').reshape(-1, genome_fields)
+
+    arrays = {'genome_meta': meta.reshape(-1)}
+    for name, typecode, dtype in node_fields + gene_fields:
+        joined = array(typecode)
+        for c in compacts:
+            joined.extend(getattr(c, name))
+        arrays[name] = np.asarray(joined).astype(dtype)
+    return arrays
+
+
+def unpack_genomes(arrays : Dict[str, np.ndarray]) -> List[Genome]:
+    """Returns the genomes pack_genomes stored, as Player.genome_class"""
+    meta = arrays['genome_meta'].reshape(-1, genome_fields).tolist()
+    nodes = [(name, typecode, arrays[name].tolist()) for name, typecode, _ in node_fields]
+    genes = [(name, typecode, arrays[name].tolist()) for name, typecode, _ in gene_fields]
+
+    genomes = []
+    n0 = e0 = 0
+    for inputs, outputs, layers, next_node, bias_node, node_count, gene_count in meta:
+        c = CompactGenome(inputs, outputs, True)
+        c.layers = layers
+        c.next_node = next_node
+        c.bias_node = bias_node
+
+        n1 = n0 + node_count
+        e1 = e0 + gene_count
+        for name, typecode, values in nodes:
+            setattr(c, name, array(typecode, values[n0:n1]))
+        for name, typecode, values in genes:
+            setattr(c, name, array(typecode, values[e0:e1]))
+
+        genomes.append(c if Player.genome_class is CompactGenome else c.to_genome())
+        n0 = n1
+        e0 = e1
+    return genomes
+
+
+def pack_networks(genomes : List[Genome]) -> Dict[str, np.ndarray]:
+    """Returns the genomes' compiled networks as arrays, so loading doesn't have to compile them again"""
+    nets = [g.compiled for g in genomes if g.compiled is not None]
+    meta = np.array([(g.compiled.size, g.compiled.bias, len(g.compiled.inputs), len(g.compiled.outputs), len(g.compiled.src))
+                     if g.compiled is not None else (-1, 0, 0, 0, 0) for g in genomes], dtype='<i8')
+    return {
+        'net_meta': meta.reshape(-1),
+        'net_inputs': np.array([i for net in nets for i in net.inputs], dtype='<i4'),
+        'net_outputs': np.array([o for net in nets for o in net.outputs], dtype='<i4'),
+        'net_output_act': np.array([a for net in nets for a in net.output_activate], dtype='i1'),
+        'net_layers': np.array([l for net in nets for l in net.layers], dtype='<i4'),
+        'net_src': np.array([i for net in nets for i in net.src], dtype='<i4'),
+        'net_dst': np.array([j for net in nets for j in net.dst], dtype='<i4'),
+        'net_weight': np.array([w for net in nets for w in net.weight], dtype='<f8'),
+        'net_activate': np.array([a for net in nets for a in net.activate], dtype='i1'),
+    }
+
+
+def unpack_networks(arrays : Dict[str, np.ndarray], genomes : List[Genome]) -> None:
+    """Gives genomes back the compiled networks pack_networks stored, and the node order that goes with them"""
+    inputs = arrays['net_inputs'].tolist()
+    outputs = arrays['net_outputs'].tolist()
+    output_activate = arrays['net_output_act'].astype(bool).tolist()
+    layers = arrays['net_layers'].tolist()
+    src = arrays['net_src'].tolist()
+    dst = arrays['net_dst'].tolist()
+    weight = arrays['net_weight'].tolist()
+    activate = arrays['net_activate'].astype(bool).tolist()
+
+    i0 = o0 = n0 = e0 = 0
+    for g, (size, bias, input_count, output_count, conn_count) in zip(genomes, arrays['net_meta'].reshape(-1, network_fields).tolist()):
+        if size == -1:
+            continue
+
+        i1, o1, n1, e1 = i0 + input_count, o0 + output_count, n0 + size, e0 + conn_count
+        g.compiled = CompiledNetwork.from_arrays(size, inputs[i0:i1], bias, outputs[o0:o1], layers[n0:n1],
+                                                 src[e0:e1], dst[e0:e1], weight[e0:e1], activate[e0:e1],
+                                                 output_activate[o0:o1])
+        # the order generate_network puts the nodes in, layer by layer
+        if isinstance(g, Genome):
+            g.network = sorted((n for n in g.nodes if n.layer < g.layers), key=lambda n: n.layer)
+        i0, o0, n0, e0 = i1, o1, n1, e1
+
+
+def write_arrays(path : str, arrays : Dict[str, np.ndarray]) -> None:
+    """Writes the arrays behind a header and directory, 8 byte aligned, replacing path only once it's complete"""
+    offset = header_format.size + entry_format.size * len(arrays)
+    entries = []
+    for name, a in arrays.items():
+        if len(name.encode()) > 16:
+            raise ValueError(f'array name {name} is longer than 16 bytes')
+        offset += -offset % 8
+        entries.append(entry_format.pack(name.encode(), a.dtype.str.encode(), len(a), offset))
+        offset += a.nbytes
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header_format.pack(MAGIC, VERSION, 0, len(arrays)))
+        f.write(b''.join(entries))
+        for a in arrays.values():
+            f.write(b'\0' * (-f.tell() % 8))
+            f.write(a.tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_arrays(buffer) -> Dict[str, np.ndarray]:
+    """Returns views of the arrays in a checkpoint held in buffer"""
+    magic, version, _, count = header_format.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError('not a population checkpoint')
+    if version != VERSION:
+        raise ValueError(f'checkpoint version {version} is not supported, expected {VERSION}')
+
+    arrays = {}
+    for i in range(count):
+        name, dtype, length, offset = entry_format.unpack_from(buffer, header_format.size + i * entry_format.size)
+        arrays[name.rstrip(b'\0').decode()] = np.frombuffer(buffer, dtype=dtype.rstrip(b'\0').decode(),
+                                                                  count=length, offset=offset)
+    return arrays
+
+
+def save(population : Population, path : str) -> None:
+    """
+    Writes everything needed to carry on with population to path, including the global innovation counter
+    and the random module's state. Call it between generations, once natural_selection has made the new players.
+    """
+    # every player object once: the population, then the best players and species champions
+    rows : List[Player] = []
+    row_of : Dict[int, int] = {}
+    def row(p : Player) -> int:
+        if id(p) not in row_of:
+            row_of[id(p)] = len(rows)
+            rows.append(p)
+        return row_of[id(p)]
+
+    for p in population.players:
+        row(p)
+    best_row = row(population.best_player) if population.best_player is not None else -1
+    gen_players = [row(p) for p in population.gen_players]
+    champs = [row(s.champ) for s in population.species]
+
+    arrays = {
+        'population': np.array([population.gen, population.best_score, population.global_best_score, Genome.next_conn_num,
+                                population.is_mass_extinction, population.is_new_stage, population.gens_since_new_world,
+                                population.batch_speciation, len(population.players), best_row], dtype='<i8'),
+        'player_fitness': np.array([p.fitness for p in rows], dtype='<f8'),
+        'player_gen': np.array([p.gen for p in rows], dtype='<i8'),
+        'player_best': np.array([p.best_score for p in rows], dtype='<i8'),
+        'gen_players': np.array(gen_players, dtype='<i8'),
+    }
+
+    # species reps are stored after the players' brains
+    species = population.species
+    arrays['species_f8'] = np.array([(s.best_fitness, s.avg_fitness, s.excess_cof, s.weight_diff_cof, s.compat_thresh)
+                                     for s in species], dtype='<f8').reshape(-1)
+    arrays['species_i8'] = np.array([(s.staleness, champ, len(rows) + i) for i, (s, champ) in enumerate(zip(species, champs))],
+                                    dtype='<i8').reshape(-1)
+    arrays.update(pack_genomes([p.brain for p in rows] + [s.rep for s in species]))
+    arrays.update(pack_networks([p.brain for p in population.players]))
+
+    history = population.innovation_history
+    arrays['innovations'] = np.array([(ch.from_node.num, ch.to_node.num, ch.innovation_num, len(ch.innovation_nums))
+                                      for ch in history], dtype='<i8').reshape(-1)
+    arrays['innovation_nums'] = np.array([inno for ch in history for inno in ch.innovation_nums], dtype='<i8')
+
+    version, state, gauss_next = random.getstate()
+    arrays['random_state'] = np.array(state, dtype='<u4')
+    arrays['random_gauss'] = np.array([np.nan if gauss_next is None else gauss_next], dtype='<f8')
+
+    write_arrays(path, arrays)
+
+
+def load(path : str) -> Population:
+    """
+    Returns the population saved at path, ready for its next generation.\n
+    Restores Genome.next_conn_num and the random module's state as they were when it was saved.
+    The brains come back as Player.genome_class, whichever kind of genome they were saved from.
+    """
+    with open(path, 'rb') as f:
+        # the map is unmapped once the last array viewing it is gone
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # nothing built here is garbage, so don't let the collector keep scanning it
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return build_population(read_arrays(buffer))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def build_population(arrays : Dict[str, np.ndarray]) -> Population:
+    (gen, best_score, global_best_score, next_conn_num, is_mass_extinction, is_new_stage,
+     gens_since_new_world, batch_speciation, player_count, best_row) = arrays['population'].tolist()
+
+    genomes = unpack_genomes(arrays)
+    rows = []
+    for brain, fitness, player_gen, player_best_score in zip(genomes, arrays['player_fitness'].tolist(),
+                                                             arrays['player_gen'].tolist(),
+                                                             arrays['player_best'].tolist()):
+        p = Player(brain=brain)
+        p.fitness = fitness
+        p.gen = player_gen
+        p.best_score = player_best_score
+        rows.append(p)
+
+    population = Population(0)
+    population.gen = gen
+    population.best_score = best_score
+    population.global_best_score = global_best_score
+    population.is_mass_extinction = bool(is_mass_extinction)
+    population.is_new_stage = bool(is_new_stage)
+    population.gens_since_new_world = gens_since_new_world
+    population.batch_speciation = bool(batch_speciation)
+    population.players = rows[:player_count]
+    population.best_player = rows[best_row] if best_row != -1 else None
+    population.gen_players = [rows[i] for i in arrays['gen_players'].tolist()]
+
+    unpack_networks(arrays, [p.brain for p in population.players])
+
+    species_f8 = arrays['species_f8'].reshape(-1, 5).tolist()
+    species_i8 = arrays['species_i8'].reshape(-1, 3).tolist()
+    for (best_fitness, avg_fitness, excess_cof, weight_diff_cof, compat_thresh), (staleness, champ, rep) \
+            in zip(species_f8, species_i8):
+        s = Species(None)
+        s.best_fitness = best_fitness
+        s.avg_fitness = avg_fitness
+        s.excess_cof = excess_cof
+        s.weight_diff_cof = weight_diff_cof
+        s.compat_thresh = compat_thresh
+        s.staleness = staleness
+        s.champ = rows[champ]
+        s.set_rep(genomes[rep])
+        population.species.append(s)
+
+    history = InnovationHistory()
+    innovation_nums = arrays['innovation_nums'].tolist()
+    start = 0
+    for from_num, to_num, inno, count in arrays['innovations'].reshape(-1, 4).tolist():
+        history.append(ConnectionHistory(Node(from_num), Node(to_num), inno, innovation_nums[start:start + count]))
+        start += count
+    population.innovation_history = history
+
+    Genome.next_conn_num = next_conn_num
+    gauss_next = arrays['random_gauss'][0].item()
+    random.setstate((3, tuple(arrays['random_state'].tolist()), None if gauss_next != gauss_next else gauss_next))
+    return population
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from typing import List, Tuple, TYPE_CHECKING
+
+from player import Player
+from population import Population
+from scheduler import GenerationScheduler
+from world import World
+from neat.batch import BatchNetwork
+
+if TYPE_CHECKING:
+    from neat.genome import Genome
+
+
+def simulate_generation(population : Population, world : World, scheduler : GenerationScheduler = None) -> int:
+    """
+    Steps the world and every living bird on the fixed timestep until all birds are dead,
+    or until scheduler ends the generation and the birds left are stopped.
+    Returns the number of simulation steps taken.
+    """
+    delta_time = world.delta_time
+    steps = 0
+    while not population.done():
+        world.update(delta_time)
+        population.update_alive(None, delta_time)
+        steps += 1
+        if scheduler is not None and scheduler.tick(population):
+            population.stop()
+    return steps
+
+
+def simulate(brains : List[Genome], seed : int, size : Tuple[int, int] = (500, 720), max_steps : int = 0,
+             budget : float = 0.0, target_score : int = 0, done : List[int] = ()) -> Tuple[List[Tuple[int, int, float]], int, str]:
+    """
+    Flies a bird for each brain through the course seeded with seed until all are dead, or for max_steps steps,
+    budget seconds or until one of them scores target_score if given.\n
+    The brains at the positions in done don't fly, a FitnessCache already has their results. They are only there
+    so BatchNetwork groups the others exactly as it does in a serial run of the whole population.
+    Runs in the pool's worker processes. Returns (score, lifespan, fitness) for each brain, the steps taken
+    and the scheduler reason the birds were stopped for, None if they all crashed.
+    """
+    world = World(size, seed)
+    Player.obstacles = world.obstacles
+
+    population = Population(0)
+    for brain in brains:
+        population.players.append(Player(brain=brain))
+    for i in done:
+        population.players[i].is_alive = False
+
+    scheduler = None
+    if max_steps > 0 or budget > 0 or target_score > 0:
+        scheduler = GenerationScheduler(max_steps, gen_budget=budget, target_score=target_score)
+    steps = simulate_generation(population, world, scheduler)
+    population.flock.release()
+
+    results = []
+    for p in population.players:
+        p.calculate_fitness()
+        results.append((p.score, p.lifespan, p.fitness))
+    return results, steps, scheduler.reason if scheduler is not None else None
+
+
+def make_shards(brains : List[Genome], count : int) -> List[List[int]]:
+    """
+    Splits the population into at most count shards of roughly equal size.\n
+    A topology group BatchNetwork would evaluate together is only ever split into pieces it would still
+    batch, so every bird takes the same evaluation path it would take in a serial run.
+    brains has to be the whole population, as update_alive batches it, birds that won't fly included.
+    """
+    batch = BatchNetwork(brains)
+    pieces : List[List[int]] = []
+    for grp in batch.groups:
+        k = max(1, min(count, len(grp.members) // BatchNetwork.min_group_size))
+        pieces += [grp.members[j::k] for j in range(k)]
+    for i in range(len(brains)):
+        if batch.group_of[i] == -1:
+            pieces.append([i])
+
+    shards : List[List[int]] = [[] for _ in range(count)]
+    for piece in sorted(pieces, key=len, reverse=True):
+        min(shards, key=len).extend(piece)
+    return [sorted(s) for s in shards if len(s) > 0]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+from typing import List, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from player import Player
+    from world import Obstacles
+
+def normalize(value, old_range, new_range):
+    """Same arithmetic as Player.look, so arrays and scalars agree bit for bit"""
+    value = (value - old_range[0]) / (old_range[1] - old_range[0])
+    value = value / (new_range[1] - new_range[0]) + new_range[0]
+    return value
+
+class Flock():
+    """
+    Struct-of-arrays physics for a whole population of birds.\n
+    Every bird shares the same x position and the same pipes, so one vectorized step advances all living birds.
+    Players bound to a flock read and write their state through these arrays.
+    """
+
+    def __init__(self, players : List[Player], obstacles : Obstacles) -> None:
+        first = players[0]
+        self.players = players
+        self.obstacles = obstacles
+        self.x = first.position[0]
+        self.radius = first.radius
+        self.max_speed = first.max_speed
+        self.gravity = type(first).gravity
+
+        self.y = np.array([p.position[1] for p in players], dtype=np.float64)
+        self.velocity = np.array([p.velocity for p in players], dtype=np.float64)
+        self.last_input_time = np.array([p.last_input_time for p in players], dtype=np.float64)
+        self.score = np.array([p.score for p in players], dtype=np.int64)
+        self.last_pipe = np.array([p.last_pipe for p in players], dtype=np.int64)
+        self.is_alive = np.array([p.is_alive for p in players], dtype=bool)
+        self.alive_count = int(np.count_nonzero(self.is_alive))     # kept up to date by step and stop
+
+        for i, p in enumerate(players):
+            p.bind(self, i)
+
+    def release(self) -> None:
+        """Copies the state back into the players and unbinds them"""
+        for p in self.players:
+            p.unbind()
+        self.players = []
+
+    def alive_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.is_alive)
+
+    def stop(self) -> None:
+        """Ends the flight of every living bird where it is, as if it had crashed"""
+        self.is_alive[:] = False
+        self.alive_count = 0
+
+    def look(self, idx : np.ndarray) -> np.ndarray:
+        """Returns the vision of the birds at the given indices as rows of a matrix, same inputs as Player.look"""
+        y = self.y[idx]
+        sensors = self.obstacles.sensors[self.last_pipe[idx]]
+        pipe_x, bottom_y, top_y, top_height = sensors.T
+
+        vision = np.empty((len(idx), 4))
+        vision[:, 0] = normalize(self.velocity[idx], (-self.max_speed, self.max_speed), (-1, 1))
+        # distance to closest pipe
+        vision[:, 1] = normalize(pipe_x - self.x, (0, 720), (1, 0))
+        # distance to top of bottom pipe
+        vision[:, 2] = normalize(bottom_y - y, (0, 720), (0, 1))
+        # distance to bottom of top pipe
+        vision[:, 3] = normalize(y - top_y + top_height, (0, 720), (0, 1))
+        return vision
+
+    def flap(self, idx : np.ndarray) -> None:
+        """Flaps the birds at the given indices, same rules as Player.flap"""
+        idx = idx[self.is_alive[idx] & (self.last_input_time[idx] > 0.15)]
+        self.velocity[idx] = -self.max_speed
+        self.last_input_time[idx] = 0
+
+    def step(self, delta_time) -> None:
+        """Advances every living bird by one timestep, same rules as Player.update"""
+        idx = self.alive_indices()
+        if len(idx) == 0:
+            return
+
+        x = self.x
+        r = self.radius
+        velocity = np.clip(self.velocity[idx] + self.gravity * delta_time, -self.max_speed, self.max_speed)
+        y = np.clip(self.y[idx] + velocity, 0+r, 720-r)
+
+        # handle collisions with ground
+        alive = y < 720-r
+
+        # handle collisions with pipe, x never changes so only the y test is per bird
+        score = self.score[idx]
+        last_pipe = self.last_pipe[idx]
+        y_top = y - r
+        y_bottom = y + r
+        for pair, left, right, top, top_end, bottom, bottom_end in self.obstacles.pipes:
+            if x + r > left and x - r < right:
+                alive &= ~(((y_bottom > top) & (y_top < top_end)) | ((y_bottom > bottom) & (y_top < bottom_end)))
+
+            # check if past pipe and increment score
+            if (x - r) - right > 0:
+                passed = last_pipe != pair
+                score += passed
+                last_pipe[passed] = pair
+
+        self.velocity[idx] = velocity
+        self.y[idx] = y
+        self.is_alive[idx] = alive
+        self.alive_count -= len(idx) - int(np.count_nonzero(alive))
+        self.score[idx] = score
+        self.last_pipe[idx] = last_pipe
+        self.last_input_time[idx] += delta_time
@@ -0,0 +1,175 @@
+import argparse
+import random
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import champion
+from cache import FitnessCache
+from checkpoint import Checkpointer, load
+from evaluation import simulate_generation
+from player import Player
+from population import Population
+from scheduler import GenerationScheduler
+from stats import StatsRecorder
+from telemetry import TelemetryPublisher, generation_record
+from world import World, course_seed
+from neat.compact import CompactGenome
+
+
+def run_generation(population, world, seed=None, executor=None, workers=0, scheduler=None, cache=None,
+                   fixed_course=False) -> int:
+    """
+    Plays out one generation, then breeds the next. Returns the number of simulation steps taken.\n
+    With a seed every generation flies its own seeded course, or with fixed_course all fly the course seeded with seed.
+    With an executor the birds are spread over workers processes instead of being stepped here.
+    A scheduler can end the generation early, with workers each of them stops its own birds by the scheduler's limits.
+    A FitnessCache fills in the birds whose networks already flew the course instead of flying them again.
+    """
+    course = None
+    if seed is not None:
+        course = seed if fixed_course else course_seed(seed, population.gen)
+        world.reset(course)
+    if scheduler is not None:
+        scheduler.start_generation()
+    max_steps = scheduler.max_steps if scheduler is not None else 0
+    if cache is not None:
+        cache.begin(population, course, max_steps)
+
+    if executor is not None:
+        steps = population.evaluate_parallel(executor, workers, course, world.size, scheduler)
+    else:
+        steps = simulate_generation(population, world, scheduler)
+    population.timer.lap('simulation')
+    if cache is not None:
+        cache.end(scheduler)
+
+    population.natural_selection()
+    if seed is None:
+        world.reset()
+    return steps
+
+
+def train(population, world, generations, seed=None, executor=None, workers=0, checkpointer=None, export=None,
+          recorder=None, scheduler=None, cache=None, fixed_course=False, telemetry=None) -> None:
+    """
+    Runs generations (0 for no limit), exporting each new best player's brain to the file export if given
+    and writing a row of stats per generation with recorder if given.
+    A scheduler can cut generations short and end the run early, a cache saves flying unchanged genomes again.
+    A TelemetryPublisher given as telemetry gets a record per generation.
+    """
+    exported = population.best_player
+    total_steps = 0
+    total_gens = 0
+    start = perf_counter()
+    if scheduler is not None:
+        scheduler.start_run()
+
+    try:
+        while generations <= 0 or total_gens < generations:
+            gen = population.gen
+            gen_start = perf_counter()
+            if recorder is not None:
+                recorder.begin(population)
+            steps = run_generation(population, world, seed, executor, workers, scheduler, cache, fixed_course)
+            if recorder is not None:
+                recorder.end(population, gen, steps)
+            if checkpointer is not None:
+                checkpointer.generation_done(population)
+            if export is not None and population.best_player is not exported:
+                exported = population.best_player
+                champion.export(exported.brain, export)
+            elapsed = perf_counter() - gen_start
+
+            total_steps += steps
+            total_gens += 1
+            stopped = f'\tstopped by {scheduler.reason}' if scheduler is not None and scheduler.reason is not None else ''
+            cached = f'\tcached: {cache.last_hits}' if cache is not None else ''
+            print(f'Gen {gen}\tbest score: {population.global_best_score}\tsteps: {steps}\t'
+                  f'{elapsed:.2f}s\t{steps / max(elapsed, 1e-9):.0f} steps/s{cached}{stopped}')
+            if telemetry is not None:
+                telemetry.publish(generation_record(population, gen, steps, elapsed))
+            if scheduler is not None and scheduler.run_over(population):
+                print(f'Stopping: {scheduler.reason}')
+                break
+    except KeyboardInterrupt:
+        pass
+
+    elapsed = max(perf_counter() - start, 1e-9)
+    print(f'{total_gens} generations, {total_steps} steps in {elapsed:.2f}s: '
+          f'{total_gens / elapsed:.3f} gens/s, {total_steps / elapsed:.0f} steps/s')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the Flappy Bird AI without a window')
+    parser.add_argument('--population', type=int, default=500, help='number of birds per generation')
+    parser.add_argument('--generations', type=int, default=0, help='generations to train, 0 to run until interrupted')
+    parser.add_argument('--seed', type=int, default=None, help='seed for the random module')
+    parser.add_argument('--course-seed', type=int, default=None,
+                        help='fly every generation through a pipe course seeded from this, needed for --workers')
+    parser.add_argument('--fixed-course', action='store_true',
+                        help='fly every generation through the course seeded with --course-seed instead of a new one each')
+    parser.add_argument('--fitness-cache', type=int, default=0,
+                        help='remember the results of this many networks so unchanged ones are not flown again, needs --fixed-course')
+    parser.add_argument('--workers', type=int, default=0, help='processes to evaluate generations on, 0 to run serially')
+    parser.add_argument('--max-steps', type=int, default=0, help='simulation steps a generation may last, 0 for no limit')
+    parser.add_argument('--gen-budget', type=float, default=0.0, help='seconds a generation may last, 0 for no limit')
+    parser.add_argument('--run-budget', type=float, default=0.0, help='seconds to train for, 0 for no limit')
+    parser.add_argument('--target-score', type=int, default=0, help='stop once a bird scores this, 0 to never stop')
+    parser.add_argument('--compact-genomes', action='store_true',
+                        help='keep every brain as a CompactGenome of typed arrays instead of Node and ConnectionGene objects')
+    parser.add_argument('--checkpoint', default=None, help='file to save the population to between generations')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='generations between checkpoints')
+    parser.add_argument('--resume', default=None, help='checkpoint file to carry on training from')
+    parser.add_argument('--export', default=None, help='file to export the best bird to for champion.py')
+    parser.add_argument('--stats', default=None, help='CSV (or .jsonl) file to add phase timings and counts to every generation')
+    parser.add_argument('--telemetry', default=None, metavar='ADDRESS',
+                        help='stream a JSON line per generation to clients of host:port or unix:PATH')
+    parser.add_argument('--profile-gens', type=int, nargs=2, default=None, metavar=('FIRST', 'LAST'),
+                        help='run these generations under cProfile, needs --stats')
+    parser.add_argument('--profile-out', default='profile', help='file name prefix for the profiles')
+    parser.add_argument('--trace-memory', action='store_true', help='also trace memory with tracemalloc while profiling')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.workers > 0 and args.course_seed is None:
+        parser.error('--workers needs --course-seed so every worker flies the same course')
+    if args.fixed_course and args.course_seed is None:
+        parser.error('--fixed-course needs --course-seed')
+    if args.fitness_cache > 0 and not args.fixed_course:
+        parser.error('--fitness-cache needs --fixed-course, results only carry over between generations on the same course')
+    if args.profile_gens is not None and args.stats is None:
+        parser.error('--profile-gens needs --stats')
+
+    if args.compact_genomes:
+        Player.genome_class = CompactGenome
+    world = World()
+    Player.obstacles = world.obstacles
+    if args.resume is not None:
+        population = load(args.resume)
+        print(f'Resumed at gen {population.gen} with {len(population.players)} players')
+    else:
+        population = Population(args.population)
+    checkpointer = Checkpointer(args.checkpoint, args.checkpoint_every) if args.checkpoint is not None else None
+    scheduler = GenerationScheduler(args.max_steps, args.gen_budget, args.run_budget, args.target_score)
+    cache = FitnessCache(args.fitness_cache) if args.fitness_cache > 0 else None
+    telemetry = TelemetryPublisher(args.telemetry) if args.telemetry is not None else None
+    recorder = None
+    if args.stats is not None:
+        recorder = StatsRecorder(args.stats, args.profile_gens, args.profile_out, args.trace_memory)
+
+    if args.workers > 0:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            train(population, world, args.generations, args.course_seed, executor, args.workers, checkpointer, args.export,
+                  recorder, scheduler, cache, args.fixed_course, telemetry)
+    else:
+        train(population, world, args.generations, args.course_seed, checkpointer=checkpointer, export=args.export,
+              recorder=recorder, scheduler=scheduler, cache=cache, fixed_course=args.fixed_course, telemetry=telemetry)
+    if recorder is not None:
+        recorder.close()
+    if telemetry is not None:
+        telemetry.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Island model training: several populations evolving side by side, one process each, trading their best genomes.\n
+Every island is a whole Population with its own World, flown exactly like headless training.
+Every migrate_every generations each island sends the champions of its best species to the next island round a ring
+and takes in the ones sent to it in place of its last bred children. Nothing else is shared, so the islands only wait on
+each other once per migration.
+The genes of the starting topology, input and bias to output connections on genomes without hidden nodes, are
+numbered the same on every island so migrants match their hosts' genes and can join their species. Every later
+innovation is numbered from the island's own offset, so a migrant's genes never clash with ones that mean something
+else on the island it lands on.
+
+Run as python islands.py, see --help for the options.
+"""
+from __future__ import annotations
+from typing import List, Tuple
+import argparse
+import io
+import multiprocessing as mp
+import queue
+import random
+from contextlib import redirect_stdout
+from time import perf_counter
+
+import champion
+from headless import run_generation
+from player import Player
+from population import Population
+from scheduler import GenerationScheduler
+from world import World
+from neat.connection import ConnectionHistory, InnovationHistory
+from neat.genome import Genome
+from neat.node import Node
+
+innovation_stride = 10_000_000      # innovation numbers each island can hand out before running into the next one's
+shared_innovations = 420            # numbers below this are the starting topology's, the same on every island
+
+
+def island_seed(seed : int, index : int) -> int:
+    """Returns the random module seed for island index of a run seeded with seed"""
+    return seed * 1009 + index
+
+
+def shared_history(inputs : int, outputs : int) -> InnovationHistory:
+    """
+    Returns an innovation history numbering every gene of the starting topology, from 0 up.\n
+    Covers every input and bias to output connection added, in any order, to a genome without hidden nodes,
+    exactly the entries mutating the starting genomes would make. Every island starts from the same one.
+    """
+    history = InnovationHistory()
+    sources = list(range(inputs)) + [inputs + outputs]
+    conns = [(f, inputs + o) for f in sources for o in range(outputs)]
+
+    def add_all(genes : List[Tuple[int, int]], innos : List[int]) -> None:
+        for conn in conns:
+            if conn in genes:
+                continue
+            if len(history) >= shared_innovations:
+                raise ValueError(f'starting topology has more than {shared_innovations} innovations to share')
+            inno = len(history)
+            history.append(ConnectionHistory(Node(conn[0]), Node(conn[1]), inno, innos))
+            add_all(genes + [conn], innos + [inno])
+
+    add_all([], [])
+    return history
+
+
+def take_migrants(population : Population, count : int) -> List[Genome]:
+    """Returns copies of the brains of the champions of population's count best species"""
+    return [s.champ.brain.clone() for s in population.species[:count]]
+
+
+def add_migrants(population : Population, migrants : List[Genome]) -> Tuple[int, int]:
+    """
+    Puts migrants in the place of the population's last bred children, the ones bred from its best species.\n
+    The species champions and best player natural_selection carried over are never replaced, so migrants beyond the
+    number of bred children are dropped.
+    Returns how many migrants were taken in and how many of those are close enough to one of the population's species
+    to join it at the next speciate.
+    """
+    carried_over = set(population.carried_over)
+    bred = [i for i in reversed(range(len(population.players))) if i not in carried_over]
+    taken = settled = 0
+    for i, brain in zip(bred, migrants):
+        taken += 1
+        if any(s.is_same_species(brain) for s in population.species):
+            settled += 1
+        brain.generate_network()
+        population.players[i] = Player(brain=brain)
+    return taken, settled
+
+
+def run_island(index : int, size : int, generations : int, migrate_every : int, migrants : int, seed : int, course : int,
+               max_steps : int, inbox : mp.Queue, outbox : mp.Queue, results : mp.Queue) -> None:
+    """
+    Trains island index for generations (0 for no limit) in rounds of migrate_every, swapping migrants in between.\n
+    The last round is shorter if generations isn't a multiple of migrate_every.
+    Sends (index, gen, best score, steps, migrants taken in, migrants that matched a species, best genome if it changed
+    since the last report else None) to results after every round, then (index, None, ...) when finished.
+    """
+    random.seed(island_seed(seed, index) if seed is not None else None)
+    player = Player()
+    history = shared_history(player.genome_inputs, player.genome_outputs)
+    Genome.next_conn_num = shared_innovations + index * innovation_stride
+
+    world = World(seed=course)
+    Player.obstacles = world.obstacles
+    population = Population(size, history)
+    scheduler = GenerationScheduler(max_steps) if max_steps > 0 else None
+    reported = None
+
+    done = 0
+    while generations <= 0 or done < generations:
+        steps = arrived = settled = 0
+        for _ in range(migrate_every if generations <= 0 else min(migrate_every, generations - done)):
+            with redirect_stdout(io.StringIO()):     # natural_selection prints every new best score
+                steps += run_generation(population, world, course, scheduler=scheduler)
+            done += 1
+
+        if generations <= 0 or done < generations:
+            outbox.put(take_migrants(population, migrants))
+            arrived, settled = add_migrants(population, inbox.get())
+
+        best = None
+        if population.best_player is not None and population.best_player is not reported:
+            reported = population.best_player
+            best = reported.brain
+        results.put((index, population.gen - 1, population.best_score, steps, arrived, settled, best))
+    results.put((index, None, population.best_score, 0, 0, 0, None))
+
+
+class Archipelago():
+    """
+    Starts the island processes, connected in a ring, and gathers their reports into the overall best.\n
+    An island that dies stops the whole run rather than leaving the others waiting for its migrants.
+    """
+
+    def __init__(self, islands : int, size : int, generations : int, migrate_every : int, migrants : int,
+                 seed : int = None, course : int = None, max_steps : int = 0) -> None:
+        self.migrate_every = max(1, migrate_every)
+        self.best_score = 0
+        self.best_island : int = None
+        self.best_genome : Genome = None
+        self.scores = [0] * islands
+
+        self.results = mp.Queue()
+        inboxes = [mp.Queue() for _ in range(islands)]
+        self.processes = [mp.Process(target=run_island, daemon=True,
+                                     args=(i, size, generations, self.migrate_every, migrants, seed, course, max_steps,
+                                           inboxes[i], inboxes[(i + 1) % islands], self.results))
+                          for i in range(islands)]
+
+    def receive(self) -> Tuple:
+        while True:
+            try:
+                return self.results.get(timeout=1)
+            except queue.Empty:
+                for i, p in enumerate(self.processes):
+                    if p.exitcode not in (None, 0):
+                        raise RuntimeError(f'island {i} exited with code {p.exitcode}')
+
+    def run(self, export : str = None) -> None:
+        """Trains until every island is done, printing each round and exporting every new overall best if export is given"""
+        for p in self.processes:
+            p.start()
+
+        start = perf_counter()
+        running = len(self.processes)
+        reports = {}
+        try:
+            while running > 0:
+                index, gen, score, steps, arrived, settled, genome = self.receive()
+                if gen is None:
+                    running -= 1
+                    continue
+
+                self.scores[index] = score
+                if genome is not None and (self.best_genome is None or score > self.best_score):
+                    self.best_score, self.best_island, self.best_genome = score, index, genome
+                    if export is not None:
+                        champion.export(genome, export)
+
+                reports.setdefault(gen, []).append((steps, arrived, settled))
+                if len(reports[gen]) == len(self.processes):
+                    steps, arrived, settled = (sum(column) for column in zip(*reports.pop(gen)))
+                    best = f'\tbest: {self.best_score} (island {self.best_island})' if self.best_island is not None else ''
+                    migrated = f'\tmigrants settled: {settled}/{arrived}' if arrived > 0 else ''
+                    print(f'Gen {gen}\tisland bests: {self.scores}{best}\t'
+                          f'steps: {steps}{migrated}\t{perf_counter() - start:.2f}s')
+        finally:
+            for p in self.processes:
+                if p.is_alive():
+                    p.terminate()
+                p.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the Flappy Bird AI as islands of populations in separate processes')
+    parser.add_argument('--islands', type=int, default=max(1, mp.cpu_count()), help='number of islands, one process each')
+    parser.add_argument('--population', type=int, default=200, help='number of birds per island')
+    parser.add_argument('--generations', type=int, default=50,
+                        help='generations for every island to train, 0 to run until interrupted')
+    parser.add_argument('--migrate-every', type=int, default=5, help='generations between migrations')
+    parser.add_argument('--migrants', type=int, default=2, help='species champions each island sends on per migration')
+    parser.add_argument('--seed', type=int, default=None, help='seed the islands\' random modules are seeded from')
+    parser.add_argument('--course-seed', type=int, default=None,
+                        help='fly every generation of every island through a pipe course seeded from this')
+    parser.add_argument('--max-steps', type=int, default=0, help='simulation steps a generation may last, 0 for no limit')
+    parser.add_argument('--export', default=None, help='file to export the best bird of all islands to for champion.py')
+    args = parser.parse_args(argv)
+
+    archipelago = Archipelago(max(1, args.islands), args.population, args.generations, args.migrate_every, args.migrants,
+                              args.seed, args.course_seed, args.max_steps)
+    try:
+        archipelago.run(args.export)
+    except KeyboardInterrupt:
+        pass
+    if archipelago.best_island is not None:
+        print(f'Best score {archipelago.best_score} from island {archipelago.best_island}')
+    else:
+        print('No island scored')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import argparse
 import sys
-from time import time
 import pygame
 
+import checkpoint
 from player import Player
-from pipe import PipePair
 from population import Population
+from render import AIRenderer, ManualRenderer
+from scheduler import GenerationScheduler
+from world import World
 
 bird_yellow = (250, 239, 32)
 pipe_green = (105, 214, 21)
@@ -15,10 +17,20 @@ white = (255, 255, 255)
 window_size = (500, 720)
 font_size = 60
 manual_mode = False
+max_steps_per_frame = 1024
+uncapped_chunk = 5000
+max_frame_time = 0.25
 
 
-def game_loop(screen, size, font, player, pipe_pairs):
-    prev_time = time()
+def game_loop(player, world, renderer, fps=60):
+    """
+    Manual play at up to fps frames per second. Physics always steps by world.delta_time,
+    as many steps as the real time since the last frame holds, and the renderer interpolates the rest.
+    """
+    clock = pygame.time.Clock()
+    delta_time = world.delta_time
+    accumulator = 0.0
+    previous = renderer.capture(player, world)
 
     while True:
         if not player.is_alive:
@@ -26,82 +38,106 @@ def game_loop(screen, size, font, player, pipe_pairs):
             break
 
         for event in pygame.event.get():
-            curr_time = time()
             if event.type == pygame.QUIT:
-                pygame.quit()
+                return
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     player.flap()
-        
-        curr_time = time()
-        surf = pygame.Surface(size)
-        surf.fill(sky_blue)
 
-        delta_time = curr_time - prev_time
-        for pair in pipe_pairs:
-            if pair.active:
-                if pair.top_pipe.position[0] < size[0] / 2 - 50:
-                    pipe_pairs[1].start()
-                pair.update(delta_time)
-        player.update(delta_time)
+        # sleeps until the next frame is due, a long stall is dropped rather than simulated all at once
+        accumulator += min(clock.tick(fps) / 1000, max_frame_time)
+        while accumulator >= delta_time:
+            previous = renderer.capture(player, world)
+            world.update(delta_time)
+            player.update(delta_time)
+            accumulator -= delta_time
+
+        renderer.draw(player, world, previous, accumulator / delta_time)
+
+
+def step_simulation(population, world, checkpointer=None, scheduler=None) -> bool:
+    """
+    Advances the pipes and the birds by one tick, returns whether a new generation was made.
+    The scheduler, if given, can stop the birds still flying to end a generation early.
+    """
+    delta_time = world.delta_time
+    world.update(delta_time)
+
+    if not population.done():
+        population.update_alive(None, delta_time)
+        if scheduler is not None and scheduler.tick(population):
+            population.stop()
+        return False
+
+    population.natural_selection()
+    world.reset()
+    if checkpointer is not None:
+        checkpointer.generation_done(population)
+    if scheduler is not None:
+        scheduler.start_generation()
+    return True
+
+
+def game_loop_ai(population, world, renderer, steps_per_frame=1, uncapped=False, checkpointer=None, scheduler=None):
+    """
+    Runs steps_per_frame simulation ticks for every rendered frame, or with uncapped whole generations.
+    Up/down double or halve steps_per_frame and U toggles uncapped while running.
+    Returns once the window is closed or the scheduler ends the run.
+    """
+    if scheduler is not None:
+        scheduler.start_run()
 
-        for pair in pipe_pairs:
-            if pair.active:
-                pair.draw(surf)
-        player.draw(surf)
-
-        text_surf = font.render(f'{player.score}', True, white)
-
-        screen.blit(surf, (0,0))
-        screen.blit(text_surf, (size[0]/2 - font_size/2, 0))
-        pygame.display.flip()
-        prev_time = curr_time
-
-
-def game_loop_ai(screen, size, font, population, pipe_pairs):
     while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-        
-        surf = pygame.Surface(size)
-        surf.fill(sky_blue)
-
-        delta_time = 0.0027
-        for pair in pipe_pairs:
-            if pair.active:
-                if pair.top_pipe.position[0] < size[0] / 2 - 50:
-                    pipe_pairs[1].start()
-                pair.update(delta_time)
-
-        for pair in pipe_pairs:
-            if pair.active:
-                pair.draw(surf)
-
-        if not population.done():
-            population.update_alive(surf, delta_time)
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_UP:
+                    steps_per_frame = min(steps_per_frame * 2, max_steps_per_frame)
+                elif event.key == pygame.K_DOWN:
+                    steps_per_frame = max(steps_per_frame // 2, 1)
+                elif event.key == pygame.K_u:
+                    uncapped = not uncapped
+
+        if uncapped:
+            # only draw once a generation is over, checking for input every uncapped_chunk ticks
+            new_gen = False
+            for _ in range(uncapped_chunk):
+                if step_simulation(population, world, checkpointer, scheduler):
+                    new_gen = True
+                    break
+            if not new_gen:
+                continue
         else:
-            population.natural_selection()
-            reset(pipe_pairs)
-
-        score_surf = font.render(f'{population.global_best_score}', True, white)
-        gen_surf = font.render(f'Gen: {population.gen}', True, white)
-
-        screen.blit(surf, (0,0))
-        screen.blit(score_surf, (size[0]/2 - font_size/2, 5))
-        screen.blit(gen_surf, (5, 5))
-        pygame.display.flip()
+            new_gen = False
+            for _ in range(steps_per_frame):
+                new_gen |= step_simulation(population, world, checkpointer, scheduler)
 
+        if new_gen and scheduler is not None and scheduler.run_over(population):
+            print(f'Stopping: {scheduler.reason}')
+            return
 
-def reset(pipe_pairs):
-    for pipe in pipe_pairs:
-        pipe.reset()
-    pipe_pairs[0].start()
+        renderer.draw(population, world, 'uncapped' if uncapped else f'x{steps_per_frame}')
 
 
 def main():
     parser = argparse.ArgumentParser(description='Watch AI learn to play Flappy Bird!')
     parser.add_argument('--manual', action='store_true', help='manual option to play it yourself')
+    parser.add_argument('--fps', type=int, default=60, help='frame rate to draw manual play at')
+    parser.add_argument('--show', choices=AIRenderer.policies, default='all',
+                        help='birds to draw while training: all living birds, the top scorers or the current best')
+    parser.add_argument('--top', type=int, default=10, help='number of birds drawn with --show top')
+    parser.add_argument('--steps-per-frame', type=int, default=1,
+                        help='simulation ticks per rendered frame, change it with up/down while running')
+    parser.add_argument('--uncapped', action='store_true',
+                        help='only draw at the end of each generation, toggle it with U while running')
+    parser.add_argument('--max-steps', type=int, default=0, help='simulation steps a generation may last, 0 for no limit')
+    parser.add_argument('--gen-budget', type=float, default=0.0, help='seconds a generation may last, 0 for no limit')
+    parser.add_argument('--run-budget', type=float, default=0.0, help='seconds to train for, 0 for no limit')
+    parser.add_argument('--target-score', type=int, default=0, help='stop once a bird scores this, 0 to never stop')
+    parser.add_argument('--checkpoint', default=None, help='file to save the population to between generations')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='generations between checkpoints')
+    parser.add_argument('--resume', default=None, help='checkpoint file to carry on training from')
     args = parser.parse_args()
     manual_mode = args.manual
 
@@ -111,15 +147,19 @@ def main():
     font = pygame.font.SysFont('Calibri', font_size, True)
 
     screen = pygame.display.set_mode(window_size)
-    pipe_pairs = [PipePair(500), PipePair(500)]
-    pipe_pairs[0].start()
-    player = Player(pipes=pipe_pairs)
+    world = World(window_size)
+    player = Player(obstacles=world.obstacles)
     
     if manual_mode:
-        game_loop(screen, window_size, font, player, pipe_pairs)
+        renderer = ManualRenderer(screen, window_size, font, font_size, sky_blue, white)
+        game_loop(player, world, renderer, max(1, args.fps))
     else:
-        population = Population(500)
-        game_loop_ai(screen, window_size, font, population, pipe_pairs)
+        population = checkpoint.load(args.resume) if args.resume is not None else Population(500)
+        checkpointer = checkpoint.Checkpointer(args.checkpoint, args.checkpoint_every) if args.checkpoint is not None else None
+        renderer = AIRenderer(screen, window_size, font, font_size, sky_blue, white, args.show, args.top)
+        scheduler = GenerationScheduler(args.max_steps, args.gen_budget, args.run_budget, args.target_score)
+        steps_per_frame = min(max(1, args.steps_per_frame), max_steps_per_frame)
+        game_loop_ai(population, world, renderer, steps_per_frame, args.uncapped, checkpointer, scheduler)
 
     pygame.quit()
     sys.exit()
@@ -1 +1 @@
-__all__ = ["connection", "genome", "node", "species"]
\ No newline at end of file
+__all__ = ["batch", "compact", "connection", "genome", "network", "node", "species"]
\ No newline at end of file
@@ -0,0 +1,95 @@
+from __future__ import annotations
+from typing import Dict, List, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from .genome import Genome
+    from .network import CompiledNetwork
+
+class TopologyGroup():
+    """Genomes whose compiled networks only differ in their weights, evaluated together"""
+
+    def __init__(self, network : CompiledNetwork) -> None:
+        self.network = network
+        self.members : List[int] = []
+        self.weights : np.ndarray = None    # one row per connection, one column per member
+
+    def feedforward(self, columns : np.ndarray, input_vals : np.ndarray) -> np.ndarray:
+        """
+        Runs the given members on rows of input_vals in one pass, connection by connection.\n
+        Each member's sums are built in the same order as CompiledNetwork.feedforward.
+        """
+        net = self.network
+        n = len(columns)
+        values = np.zeros((net.size, n))
+        sums = np.zeros((net.size, n))
+        values[net.inputs] = input_vals.T
+        values[net.bias] = 1
+
+        weights = self.weights[:, columns]
+        for k, (s, d, act) in enumerate(zip(net.src, net.dst, net.activate)):
+            if act:
+                values[s] = 1. / (1 + np.exp(-sums[s]))
+            sums[d] += weights[k] * values[s]
+
+        for o, act in zip(net.outputs, net.output_activate):
+            if act:
+                values[o] = 1. / (1 + np.exp(-sums[o]))
+        return values[net.outputs].T
+
+class BatchNetwork():
+    """
+    Evaluates a whole population of genomes with one call per tick.\n
+    Genomes are grouped by compiled topology so each group runs as a handful of array operations
+    over all of its members, while genomes with a topology of their own keep the scalar path.
+    """
+
+    min_group_size = 8     # smaller groups are quicker through CompiledNetwork.feedforward
+
+    def __init__(self, genomes : List[Genome]) -> None:
+        self.genomes = genomes
+        self.outputs = genomes[0].outputs if len(genomes) > 0 else 0
+
+        groups : Dict[tuple, TopologyGroup] = {}
+        for i, g in enumerate(genomes):
+            net = g.compiled
+            if net is None:
+                continue
+            key = (net.size, tuple(net.inputs), net.bias, tuple(net.outputs), tuple(net.src), tuple(net.dst),
+                   tuple(net.activate), tuple(net.output_activate))
+            if key not in groups:
+                groups[key] = TopologyGroup(net)
+            groups[key].members.append(i)
+
+        self.groups = [grp for grp in groups.values() if len(grp.members) >= self.min_group_size]
+        self.group_of = np.full(len(genomes), -1, dtype=np.int64)
+        self.column_of = np.zeros(len(genomes), dtype=np.int64)
+        for gi, grp in enumerate(self.groups):
+            grp.weights = np.array([genomes[i].compiled.weight for i in grp.members], dtype=np.float64).T
+            self.group_of[grp.members] = gi
+            self.column_of[grp.members] = np.arange(len(grp.members))
+
+    def feedforward(self, idx : np.ndarray, input_vals : np.ndarray) -> np.ndarray:
+        """Returns the outputs of genomes idx for the matching rows of input_vals"""
+        outputs = np.empty((len(idx), self.outputs))
+        group_ids = self.group_of[idx]
+
+        order = np.argsort(group_ids, kind='stable')
+        bounds = np.searchsorted(group_ids[order], np.arange(-1, len(self.groups) + 1))
+        for gi in range(-1, len(self.groups)):
+            rows = order[bounds[gi + 1]:bounds[gi + 2]]
+            if len(rows) == 0:
+                continue
+
+            if gi == -1:
+                vision = input_vals[rows].tolist()
+                for r, v in zip(rows, vision):
+                    outputs[r] = self.genomes[idx[r]].feedforward(v)
+            else:
+                outputs[rows] = self.groups[gi].feedforward(self.column_of[idx[rows]], input_vals[rows])
+
+        return outputs
+
+    def decide(self, idx : np.ndarray, input_vals : np.ndarray) -> np.ndarray:
+        """Returns which of genomes idx want to flap, same threshold as Player.think"""
+        return self.feedforward(idx, input_vals)[:, 0] > 0.6
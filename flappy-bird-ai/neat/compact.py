@@ -0,0 +1,290 @@
+from __future__ import annotations
+from array import array
+from typing import Dict, List, Tuple
+import random
+
+from .connection import ConnectionGene, ConnectionHistory, InnovationHistory, perturb_weight
+from .genome import Genome
+from .network import CompiledNetwork
+from .node import Node
+
+class CompactGenome():
+    """
+    A Genome stored as parallel typed arrays instead of Node and ConnectionGene objects.\n
+    Nodes are num/layer arrays and genes are from/to (node nums), weight, enabled and innovation arrays,
+    so copying is a handful of memcpys and a genome costs a few bytes per gene.
+    Mutation, crossover and feedforward follow Genome exactly, drawing the same random numbers, so a run
+    with Player.genome_class set to CompactGenome breeds the same generations as one with Genome.
+    from_genome/to_genome convert between the two.
+    """
+
+    __slots__ = ('inputs', 'outputs', 'layers', 'next_node', 'bias_node',
+                 'node_num', 'node_layer', 'gene_from', 'gene_to', 'gene_weight', 'gene_enabled', 'gene_inno',
+                 'compiled')
+
+    def __init__(self, inputs, outputs, crossover=False) -> None:
+        self.inputs = inputs
+        self.outputs = outputs
+        self.layers = 2
+        self.next_node = 0
+        self.bias_node = 0
+        self.node_num = array('i')
+        self.node_layer = array('i')
+        self.gene_from = array('i')
+        self.gene_to = array('i')
+        self.gene_weight = array('d')
+        self.gene_enabled = array('b')
+        self.gene_inno = array('q')
+        self.compiled : CompiledNetwork = None
+
+        if crossover:
+            return
+
+        for i in range(self.inputs + self.outputs + 1):
+            self.node_num.append(i)
+            self.node_layer.append(1 if self.inputs <= i < self.inputs + self.outputs else 0)
+        self.bias_node = self.inputs + self.outputs
+        self.next_node = self.bias_node + 1
+
+    @classmethod
+    def from_genome(cls, genome : Genome) -> CompactGenome:
+        compact = cls(genome.inputs, genome.outputs, True)
+        compact.layers = genome.layers
+        compact.next_node = genome.next_node
+        compact.bias_node = genome.bias_node
+        compact.node_num.extend(n.num for n in genome.nodes)
+        compact.node_layer.extend(n.layer for n in genome.nodes)
+        compact.gene_from.extend(conn.from_node.num for conn in genome.genes)
+        compact.gene_to.extend(conn.to_node.num for conn in genome.genes)
+        compact.gene_weight.extend(conn.weight for conn in genome.genes)
+        compact.gene_enabled.extend(conn.enabled for conn in genome.genes)
+        compact.gene_inno.extend(conn.innovation_num for conn in genome.genes)
+        return compact
+
+    def to_genome(self) -> Genome:
+        genome = Genome(self.inputs, self.outputs, True)
+        genome.layers = self.layers
+        genome.next_node = self.next_node
+        genome.bias_node = self.bias_node
+
+        # same lists and indexes append_node and append_gene would build, without a call per node and gene
+        genome.nodes = [Node(num) for num in self.node_num]
+        for n, layer in zip(genome.nodes, self.node_layer):
+            n.layer = layer
+        genome.node_index = index = {n.num: n for n in reversed(genome.nodes)}
+
+        genome.genes = [ConnectionGene(index[f], index[t], w, inno)
+                        for f, t, w, inno in zip(self.gene_from, self.gene_to, self.gene_weight, self.gene_inno)]
+        for conn, enabled in zip(genome.genes, self.gene_enabled):
+            conn.enabled = bool(enabled)
+        genome.gene_index = {conn.innovation_num: i for i, conn in reversed(list(enumerate(genome.genes)))}
+
+        genome.connect_nodes()
+        return genome
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_num)
+
+    @property
+    def gene_count(self) -> int:
+        return len(self.gene_inno)
+
+    def gene_arrays(self) -> Tuple[array, array]:
+        """Returns the innovation numbers and weights of the genes, in gene order"""
+        return self.gene_inno, self.gene_weight
+
+    def clear(self) -> None:
+        """Empties the genome back to how CompactGenome(inputs, outputs, True) starts, so clone or crossover can fill it again"""
+        self.layers = 2
+        self.next_node = 0
+        self.bias_node = 0
+        for name in ('node_num', 'node_layer', 'gene_from', 'gene_to', 'gene_weight', 'gene_enabled', 'gene_inno'):
+            del getattr(self, name)[:]
+        self.compiled = None
+
+    def node_positions(self) -> Dict[int, int]:
+        positions = {}
+        for i, num in enumerate(self.node_num):
+            positions.setdefault(num, i)
+        return positions
+
+    def append_gene(self, from_num, to_num, weight, inno, enabled=True) -> None:
+        self.gene_from.append(from_num)
+        self.gene_to.append(to_num)
+        self.gene_weight.append(weight)
+        self.gene_enabled.append(enabled)
+        self.gene_inno.append(inno)
+
+    def generate_network(self) -> None:
+        """Compiles the arrays into a CompiledNetwork for feedforward, the same one Genome.generate_network builds"""
+        network = []
+        layers = []
+        for l in range(self.layers):
+            for num, layer in zip(self.node_num, self.node_layer):
+                if layer == l:
+                    network.append(num)
+                    layers.append(layer)
+
+        self.compiled = CompiledNetwork(network, layers,
+                                        self.node_num[:self.inputs], self.node_num[self.bias_node],
+                                        self.node_num[self.inputs:self.inputs + self.outputs],
+                                        zip(self.gene_from, self.gene_to, self.gene_weight, self.gene_enabled))
+
+    def feedforward(self, input_vals) -> List[float]:
+        if self.compiled is None:
+            self.generate_network()
+        return self.compiled.feedforward(input_vals)
+
+    def is_fully_connected(self) -> bool:
+        nodes_per_layer = [0] * self.layers
+        for layer in self.node_layer:
+            nodes_per_layer[layer] += 1
+
+        max_conns = 0
+        for i in range(self.layers - 1):
+            max_conns += sum(nodes_per_layer[i + 1:]) * nodes_per_layer[i]
+
+        return max_conns <= len(self.gene_inno)
+
+    def is_connected(self, n1 : int, n2 : int) -> bool:
+        """Same answer as Node.is_connected for the nodes at positions n1 and n2"""
+        if self.node_layer[n1] == self.node_layer[n2]:
+            return False
+
+        num1 = self.node_num[n1]
+        target = self.node_num[n2] if self.node_layer[n1] < self.node_layer[n2] else num1
+        for from_num, to_num in zip(self.gene_from, self.gene_to):
+            if from_num == num1 and to_num == target:
+                return True
+        return False
+
+    def get_innovation_number(self, innovation_hist : InnovationHistory, from_num : int, to_num : int) -> int:
+        """Same as Genome.get_innovation_number, sharing Genome.next_conn_num"""
+        ch = innovation_hist.find_nums(self.gene_inno.tolist(), from_num, to_num)
+        if ch is not None:
+            return ch.innovation_num
+
+        conn_inno_num = Genome.next_conn_num
+        innovation_hist.append(ConnectionHistory(Node(from_num), Node(to_num), conn_inno_num, self.gene_inno.tolist()))
+        Genome.next_conn_num += 1
+        return conn_inno_num
+
+    def add_connection(self, innovation_hist : InnovationHistory) -> None:
+        if self.is_fully_connected():
+            return
+
+        def is_invalid_connection(n1, n2):
+            return self.node_layer[n1] == self.node_layer[n2] or self.is_connected(n1, n2)
+
+        rand_node_1 = random.randint(0, len(self.node_num) - 1)
+        rand_node_2 = random.randint(0, len(self.node_num) - 1)
+        while is_invalid_connection(rand_node_1, rand_node_2):
+            rand_node_1 = random.randint(0, len(self.node_num) - 1)
+            rand_node_2 = random.randint(0, len(self.node_num) - 1)
+
+        if self.node_layer[rand_node_1] > self.node_layer[rand_node_2]:
+            rand_node_1, rand_node_2 = rand_node_2, rand_node_1
+
+        from_num = self.node_num[rand_node_1]
+        to_num = self.node_num[rand_node_2]
+        conn_inno_num = self.get_innovation_number(innovation_hist, from_num, to_num)
+        self.append_gene(from_num, to_num, random.uniform(1, -1), conn_inno_num)
+
+    def add_node(self, innovation_hist : InnovationHistory) -> None:
+        if len(self.gene_inno) == 0:
+            self.add_connection(innovation_hist)
+            return
+
+        bias_num = self.node_num[self.bias_node]
+        rand_conn = random.randint(0, len(self.gene_inno) - 1)
+        if any(from_num != bias_num for from_num in self.gene_from):
+            while self.gene_from[rand_conn] == bias_num and len(self.gene_inno) != 1:
+                rand_conn = random.randint(0, len(self.gene_inno) - 1)
+
+        self.gene_enabled[rand_conn] = False
+        from_num = self.gene_from[rand_conn]
+        to_num = self.gene_to[rand_conn]
+
+        new_node = self.next_node
+        self.next_node += 1
+        self.node_num.append(new_node)
+        self.node_layer.append(0)
+        new_pos = len(self.node_num) - 1
+
+        conn_inno_num = self.get_innovation_number(innovation_hist, from_num, new_node)
+        self.append_gene(from_num, new_node, 1, conn_inno_num)
+
+        conn_inno_num = self.get_innovation_number(innovation_hist, new_node, to_num)
+        self.append_gene(new_node, to_num, self.gene_weight[rand_conn], conn_inno_num)
+
+        positions = self.node_positions()
+        self.node_layer[new_pos] = self.node_layer[positions[from_num]] + 1
+
+        conn_inno_num = self.get_innovation_number(innovation_hist, bias_num, new_node)
+        self.append_gene(bias_num, new_node, 0, conn_inno_num)
+
+        if self.node_layer[new_pos] == self.node_layer[positions[to_num]]:
+            for i in range(len(self.node_layer)):
+                if self.node_layer[i] >= self.node_layer[new_pos]:
+                    self.node_layer[i] += 1
+
+        self.layers += 1
+
+    def mutate(self, innovation_hist : InnovationHistory) -> None:
+        self.compiled = None
+
+        if len(self.gene_inno) == 0:
+            self.add_connection(innovation_hist)
+
+        if random.random() < 0.8:
+            for i in range(len(self.gene_weight)):
+                self.gene_weight[i] = perturb_weight(self.gene_weight[i])
+
+        if random.random() < 0.05:
+            self.add_connection(innovation_hist)
+
+        if random.random() < 0.01:
+            self.add_node(innovation_hist)
+
+    def crossover(self, other_parent : CompactGenome, into : CompactGenome = None) -> CompactGenome:
+        """Same as Genome.crossover, the child is built in into, an empty genome, if given"""
+        child = into if into is not None else CompactGenome(self.inputs, self.outputs, True)
+        child.layers = self.layers
+        child.next_node = self.next_node
+        child.bias_node = self.bias_node
+        child.node_num.extend(self.node_num)
+        child.node_layer.extend(self.node_layer)
+
+        other_index : Dict[int, int] = {}
+        for j, inno in enumerate(other_parent.gene_inno):
+            other_index.setdefault(inno, j)
+
+        for i, inno in enumerate(self.gene_inno):
+            set_enabled = True
+            parent, k = self, i
+            j = other_index.get(inno, -1)
+
+            if j != -1:
+                if not self.gene_enabled[i] or not other_parent.gene_enabled[j]:
+                    if random.random() < 0.75:
+                        set_enabled = False
+
+                if random.random() >= 0.5:
+                    parent, k = other_parent, j
+            else:
+                set_enabled = bool(self.gene_enabled[i])
+
+            child.append_gene(parent.gene_from[k], parent.gene_to[k], parent.gene_weight[k], parent.gene_inno[k], set_enabled)
+
+        return child
+
+    def clone(self, into : CompactGenome = None) -> CompactGenome:
+        """Returns a copy of this genome, built in into, an empty genome, if given"""
+        clone = into if into is not None else CompactGenome(self.inputs, self.outputs, True)
+        clone.layers = self.layers
+        clone.next_node = self.next_node
+        clone.bias_node = self.bias_node
+        for name in ('node_num', 'node_layer', 'gene_from', 'gene_to', 'gene_weight', 'gene_enabled', 'gene_inno'):
+            getattr(clone, name).extend(getattr(self, name))
+        return clone
@@ -1,14 +1,28 @@
 from __future__ import annotations
-from typing import TYPE_CHECKING
+from typing import Dict, Iterator, List, TYPE_CHECKING
 import random
 
 if TYPE_CHECKING:
     from .node import Node
     from .genome import Genome
 
+def perturb_weight(weight : float) -> float:
+    """Returns a mutated copy of a connection weight"""
+    def clamp(num, min_value, max_value):
+        return max(min(num, max_value), min_value)
+
+    p = random.random()
+    if (p < 0.1):
+        weight += random.uniform(-1, 1)
+    else:
+        weight += clamp(random.gauss(0, 1) / 50, -1, 1)
+    return weight
+
 class ConnectionGene():
     """A connection between two nodes."""
 
+    __slots__ = ('from_node', 'to_node', 'weight', 'enabled', 'innovation_num')
+
     def __init__(self, from_n : Node, to_n : Node, w : float, inno : int) -> None:
         if from_n is None or to_n is None:
             breakpoint()
@@ -19,14 +33,7 @@ class ConnectionGene():
         self.innovation_num = inno
 
     def mutate_weight(self) -> None:
-        def clamp(num, min_value, max_value):
-            return max(min(num, max_value), min_value)
-
-        p = random.random()
-        if (p < 0.1):
-            self.weight += random.uniform(-1, 1)
-        else:
-            self.weight += clamp(random.gauss(0, 1) / 50, -1, 1)
+        self.weight = perturb_weight(self.weight)
 
     def clone(self, from_n : Node, to_n : Node) -> ConnectionGene:
         clone = ConnectionGene(from_n, to_n, self.weight, self.innovation_num)
@@ -34,6 +41,9 @@ class ConnectionGene():
         return clone
 
 class ConnectionHistory():
+
+    __slots__ = ('from_node', 'to_node', 'innovation_num', 'innovation_nums')
+
     def __init__(self, from_n : Node, to_n : Node, inno : int, innos : list[int]) -> None:
         self.from_node = from_n
         self.to_node = to_n
@@ -49,4 +59,48 @@ class ConnectionHistory():
                     if conn.innovation_num not in self.innovation_nums:
                         return False
                 return True
-        return False
\ No newline at end of file
+        return False
+
+class InnovationHistory():
+    """
+    Every connection innovation made so far, indexed so finding a match doesn't scan the whole history.\n
+    Entries are keyed by (from node num, to node num, gene count, set of gene innovation numbers),
+    which is exactly what ConnectionHistory.matches checks for genomes without repeated innovation numbers.
+    Otherwise behaves like the list of ConnectionHistory it replaces.
+    """
+
+    def __init__(self) -> None:
+        self.entries : List[ConnectionHistory] = []
+        self.index : Dict[tuple, ConnectionHistory] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[ConnectionHistory]:
+        return iter(self.entries)
+
+    def __getitem__(self, i) -> ConnectionHistory:
+        return self.entries[i]
+
+    def append(self, ch : ConnectionHistory) -> None:
+        self.entries.append(ch)
+        key = (ch.from_node.num, ch.to_node.num, len(ch.innovation_nums), frozenset(ch.innovation_nums))
+        if key not in self.index:
+            self.index[key] = ch
+
+    def find(self, genome : Genome, from_n : Node, to_n : Node) -> ConnectionHistory:
+        """Returns the first entry that matches the genome and connection, or None"""
+        return self.find_nums([conn.innovation_num for conn in genome.genes], from_n.num, to_n.num)
+
+    def find_nums(self, innovation_nums : List[int], from_num : int, to_num : int) -> ConnectionHistory:
+        """Same as find, for a genome given by its genes' innovation numbers and a connection given by node numbers"""
+        innos = frozenset(innovation_nums)
+        if len(innos) == len(innovation_nums):
+            return self.index.get((from_num, to_num, len(innovation_nums), innos))
+
+        # repeated innovation numbers can match entries the index can't key, fall back to checking each one
+        for ch in self.entries:
+            if len(innovation_nums) == len(ch.innovation_nums) and from_num == ch.from_node.num and to_num == ch.to_node.num:
+                if all(inno in ch.innovation_nums for inno in innovation_nums):
+                    return ch
+        return None
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import List
+from typing import Dict, List, Tuple
 import random
 
 from .node import Node
-from .connection import ConnectionGene, ConnectionHistory
+from .connection import ConnectionGene, ConnectionHistory, InnovationHistory
+from .network import CompiledNetwork
 
 class Genome():
     """Contains the network representation for a specimen"""
@@ -13,45 +14,78 @@ class Genome():
     def __init__(self, inputs, outputs, crossover=False) -> None:
         self.genes : List[ConnectionGene] = []
         self.nodes : List[Node] = []
+        self.node_index : Dict[int, Node] = {}     # node num -> node
+        self.gene_index : Dict[int, int] = {}      # innovation num -> position of first such gene in self.genes
         self.inputs = inputs
         self.outputs = outputs
         self.layers = 2
         self.next_node = 0
         self.network : List[Node] = []
+        self.compiled : CompiledNetwork = None
 
         if crossover:
             return
 
         for i in range(self.inputs):
-            self.nodes.append(Node(i))
+            self.append_node(Node(i))
             self.next_node += 1
             self.nodes[i].layer = 0
 
         for i in range(self.outputs):
-            self.nodes.append(Node(i + self.inputs))
+            self.append_node(Node(i + self.inputs))
             self.next_node += 1
             self.nodes[i + self.inputs].layer = 1
 
-        self.nodes.append(Node(self.next_node))
+        self.append_node(Node(self.next_node))
         self.bias_node = self.next_node
         self.next_node += 1
         self.nodes[self.bias_node].layer = 0
 
+    def clear(self) -> None:
+        """Empties the genome back to how Genome(inputs, outputs, True) starts, so clone or crossover can fill it again"""
+        self.genes.clear()
+        self.nodes.clear()
+        self.node_index.clear()
+        self.gene_index.clear()
+        self.layers = 2
+        self.next_node = 0
+        self.network = []
+        self.compiled = None
+
+    @property
+    def node_count(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def gene_count(self) -> int:
+        return len(self.genes)
+
+    def gene_arrays(self) -> Tuple[List[int], List[float]]:
+        """Returns the innovation numbers and weights of the genes, in gene order"""
+        return [conn.innovation_num for conn in self.genes], [conn.weight for conn in self.genes]
+
     def get_node(self, n_num) -> Node:
-        for n in self.nodes:
-            if n.num == n_num:
-                return n
-        return None
+        return self.node_index.get(n_num)
 
-    def fully_connect(self, innovation_hist : List[ConnectionHistory]) -> None:
+    def append_node(self, n : Node) -> None:
+        """Adds a node to self.nodes, keeping the node index up to date"""
+        self.nodes.append(n)
+        self.node_index.setdefault(n.num, n)
+
+    def append_gene(self, conn : ConnectionGene) -> None:
+        """Adds a gene to self.genes, keeping the gene index up to date"""
+        self.gene_index.setdefault(conn.innovation_num, len(self.genes))
+        self.genes.append(conn)
+
+    def fully_connect(self, innovation_hist : InnovationHistory) -> None:
         """Connects all the nodes in the network"""
         for i in range(self.inputs):
             for j in range(self.outputs):
                 conn_inno_num = self.get_innovation_num(innovation_hist, self.nodes[i], self.nodes[len(self.nodes) - j - 2])
-                self.genes.append(ConnectionGene(self.nodes[i], self.nodes[len(self.nodes) - j - 2], random.uniform(-1, 1), conn_inno_num))
+                self.append_gene(ConnectionGene(self.nodes[i], self.nodes[len(self.nodes) - j - 2], random.uniform(-1, 1), conn_inno_num))
 
         conn_inno_num = self.get_innovation_num(innovation_hist, self.nodes[self.bias_node], self.nodes[len(self.nodes) - 2])
-        self.genes.append(ConnectionGene(self.bias_node, self.nodes[len(self.nodes) - 2], random.uniform(-1, 1), conn_inno_num))
+        self.append_gene(ConnectionGene(self.bias_node, self.nodes[len(self.nodes) - 2], random.uniform(-1, 1), conn_inno_num))
 
         self.connect_nodes()
 
@@ -86,7 +120,10 @@ class Genome():
             conn.from_node.out_connections.append(conn)
 
     def generate_network(self) -> None:
-        """Generates a list of nodes in order that they have to be run in, stored in self.network"""
+        """
+        Generates a list of nodes in order that they have to be run in, stored in self.network,
+        and compiles it into flat arrays for feedforward, stored in self.compiled
+        """
         self.connect_nodes()
         self.network = []
 
@@ -95,8 +132,16 @@ class Genome():
                 if n.layer == l:
                     self.network.append(n)
 
+        self.compiled = CompiledNetwork.from_genome(self)
+
     def feedforward(self, input_vals) -> List[float]:
         """Sends input through network and returns the output of network"""
+        if self.compiled is None:
+            return self.feedforward_nodes(input_vals)
+        return self.compiled.feedforward(input_vals)
+
+    def feedforward_nodes(self, input_vals) -> List[float]:
+        """Same as feedforward but walks the Node objects in self.network instead of the compiled arrays"""
         for i in range(self.inputs):
             self.nodes[i].output = input_vals[i]
         self.nodes[self.bias_node].output = 1
@@ -113,7 +158,7 @@ class Genome():
 
         return outputs
 
-    def add_node(self, innovation_hist : List[ConnectionHistory]) -> None:
+    def add_node(self, innovation_hist : InnovationHistory) -> None:
         """
         Adds a random node to the network to mutate.\n
         A random connection is picked, disabled and a new node is added with 2 new connections.
@@ -123,38 +168,40 @@ class Genome():
             return
         
         rand_conn = random.randint(0, len(self.genes)-1)
-        while self.genes[rand_conn].from_node == self.nodes[self.bias_node] and len(self.genes) != 1:
-            rand_conn = random.randint(0, len(self.genes)-1)
+        # when every gene leaves the bias node there is nothing else to pick, so a bias gene gets split
+        if any(conn.from_node != self.nodes[self.bias_node] for conn in self.genes):
+            while self.genes[rand_conn].from_node == self.nodes[self.bias_node] and len(self.genes) != 1:
+                rand_conn = random.randint(0, len(self.genes)-1)
 
         self.genes[rand_conn].enabled = False
 
-        new_node = self.next_node
+        new_node = Node(self.next_node)
         self.next_node += 1
-        self.nodes.append(Node(new_node))
+        self.append_node(new_node)
 
         # connect start of old connection to new node
-        conn_inno_num = self.get_innovation_number(innovation_hist, self.genes[rand_conn].from_node, self.get_node(new_node))
-        self.genes.append(ConnectionGene(self.genes[rand_conn].from_node, self.get_node(new_node), 1, conn_inno_num))
+        conn_inno_num = self.get_innovation_number(innovation_hist, self.genes[rand_conn].from_node, new_node)
+        self.append_gene(ConnectionGene(self.genes[rand_conn].from_node, new_node, 1, conn_inno_num))
 
         # connect new node to end of old connection
-        conn_inno_num = self.get_innovation_number(innovation_hist, self.get_node(new_node), self.genes[rand_conn].to_node)
-        self.genes.append(ConnectionGene(self.get_node(new_node), self.genes[rand_conn].to_node, self.genes[rand_conn].weight, conn_inno_num))
-        self.get_node(new_node).layer = self.genes[rand_conn].from_node.layer + 1
+        conn_inno_num = self.get_innovation_number(innovation_hist, new_node, self.genes[rand_conn].to_node)
+        self.append_gene(ConnectionGene(new_node, self.genes[rand_conn].to_node, self.genes[rand_conn].weight, conn_inno_num))
+        new_node.layer = self.genes[rand_conn].from_node.layer + 1
 
         # connect bias to new node
-        conn_inno_num = self.get_innovation_number(innovation_hist, self.nodes[self.bias_node], self.get_node(new_node))
-        self.genes.append(ConnectionGene(self.nodes[self.bias_node], self.get_node(new_node), 0, conn_inno_num))
+        conn_inno_num = self.get_innovation_number(innovation_hist, self.nodes[self.bias_node], new_node)
+        self.append_gene(ConnectionGene(self.nodes[self.bias_node], new_node, 0, conn_inno_num))
 
         # move nodes in layers above if needed
-        if self.get_node(new_node).layer == self.genes[rand_conn].to_node.layer:
+        if new_node.layer == self.genes[rand_conn].to_node.layer:
             for n in self.nodes:
-                if n.layer >= self.get_node(new_node).layer:
+                if n.layer >= new_node.layer:
                     n.layer += 1
         
         self.layers += 1
         self.connect_nodes()
 
-    def add_connection(self, innovation_hist : List[ConnectionHistory]) -> None:
+    def add_connection(self, innovation_hist : InnovationHistory) -> None:
         """
         Picks two random nodes that aren't connected to add a connection between
         """
@@ -180,10 +227,10 @@ class Genome():
             rand_node_2 = tmp
         
         conn_inno_num = self.get_innovation_number(innovation_hist, self.nodes[rand_node_1], self.nodes[rand_node_2])
-        self.genes.append(ConnectionGene(self.nodes[rand_node_1], self.nodes[rand_node_2], random.uniform(1, -1), conn_inno_num))
+        self.append_gene(ConnectionGene(self.nodes[rand_node_1], self.nodes[rand_node_2], random.uniform(1, -1), conn_inno_num))
         self.connect_nodes()
 
-    def get_innovation_number(self, innovation_hist : List[ConnectionHistory], from_n : Node, to_n : Node) -> int:
+    def get_innovation_number(self, innovation_hist : InnovationHistory, from_n : Node, to_n : Node) -> int:
         """
         Returns innovation number for mutation.\n
         If mutation is new, then a new unique innovation number is assigned.
@@ -192,11 +239,10 @@ class Genome():
         is_new = True
         conn_inno_num = Genome.next_conn_num
 
-        for ch in innovation_hist:
-            if ch.matches(self, from_n, to_n):
-                is_new = False
-                conn_inno_num = ch.innovation_num
-                break
+        ch = innovation_hist.find(self, from_n, to_n)
+        if ch is not None:
+            is_new = False
+            conn_inno_num = ch.innovation_num
         
         if is_new:
             inno_nums = []
@@ -208,13 +254,16 @@ class Genome():
         
         return conn_inno_num
 
-    def mutate(self, innovation_hist : List[ConnectionHistory]) -> None:
+    def mutate(self, innovation_hist : InnovationHistory) -> None:
         """
         Mutates the genome.\n
         80% chance to mutate connection weights\n
         5% chance to add random connection\n
         1% chance to add random node
         """
+        # weights and structure are about to change, feedforward walks the nodes until generate_network is called again
+        self.compiled = None
+
         if len(self.genes) == 0:
             self.add_connection(innovation_hist)
         
@@ -228,13 +277,12 @@ class Genome():
         if random.random() < 0.01:
             self.add_node(innovation_hist)
 
-    def crossover(self, other_parent : Genome) -> Genome:
+    def crossover(self, other_parent : Genome, into : Genome = None) -> Genome:
         """
         Called if this genome is better than other parent. Creates a child genome with mix of genes from another parent.
+        The child is built in into, an empty genome, if given.
         """
-        child = Genome(self.inputs, self.outputs, True)
-        child.genes = []
-        child.nodes = []
+        child = into if into is not None else Genome(self.inputs, self.outputs, True)
         child.layers = self.layers
         child.next_node = self.next_node
         child.bias_node = self.bias_node
@@ -262,29 +310,27 @@ class Genome():
             is_enabled.append(set_enabled)
 
         for n in self.nodes:
-            child.nodes.append(n.clone())
+            child.append_node(n.clone())
         
         for i, conn in enumerate(child_genes):
-            child.genes.append(conn.clone(child.get_node(conn.from_node.num), child.get_node(conn.to_node.num)))
+            child.append_gene(conn.clone(child.get_node(conn.from_node.num), child.get_node(conn.to_node.num)))
             child.genes[i].enabled = is_enabled[i]
 
         child.connect_nodes()
         return child
 
     def find_matching_gene(self, parent : Genome, inno) -> int:
-        for i, conn in enumerate(parent.genes):
-            if conn.innovation_num == inno:
-                return i
-        return -1
+        return parent.gene_index.get(inno, -1)
 
-    def clone(self) -> Genome:
-        clone = Genome(self.inputs, self.outputs, True)
+    def clone(self, into : Genome = None) -> Genome:
+        """Returns a copy of this genome, built in into, an empty genome, if given"""
+        clone = into if into is not None else Genome(self.inputs, self.outputs, True)
 
         for n in self.nodes:
-            clone.nodes.append(n.clone())
+            clone.append_node(n.clone())
 
         for conn in self.genes:
-            clone.genes.append(conn.clone(clone.get_node(conn.from_node.num), clone.get_node(conn.to_node.num)))
+            clone.append_gene(conn.clone(clone.get_node(conn.from_node.num), clone.get_node(conn.to_node.num)))
 
         clone.layers = self.layers
         clone.next_node = self.next_node
@@ -0,0 +1,103 @@
+from __future__ import annotations
+from typing import List, TYPE_CHECKING
+import math
+
+if TYPE_CHECKING:
+    from .genome import Genome
+
+class CompiledNetwork():
+    """
+    Flat array form of a genome's network, built by Genome.generate_network.\n
+    Nodes are numbered by their position in the network and enabled connections become parallel
+    source/target/weight arrays, ordered the same way Node.forward would visit them.
+    Connections that Node.forward could never deliver (into a node that has already fired) are dropped,
+    so the outputs are bit for bit the same as walking the nodes.
+    """
+
+    def __init__(self, network : list, layers : List[int], inputs : list, bias, outputs : list, connections : list) -> None:
+        """
+        network lists the nodes in the order they fire and layers their layers. Nodes can be anything hashable,
+        inputs, bias and outputs name nodes from network. connections are (from node, to node, weight, enabled)
+        tuples in gene order.
+        """
+        position = {}
+        for i, n in enumerate(network):
+            position[n] = i
+
+        self.size = len(network)
+        self.inputs = [position[n] for n in inputs]
+        self.bias = position[bias]
+        self.outputs = [position[n] for n in outputs]
+        self.layers = list(layers)
+
+        # the connections leaving each node, in gene order, like Node.out_connections
+        out_connections = [[] for _ in network]
+        for from_n, to_n, weight, enabled in connections:
+            i = position.get(from_n)
+            if i is not None:
+                out_connections[i].append((position.get(to_n), weight, enabled))
+
+        self.src : List[int] = []
+        self.dst : List[int] = []
+        self.weight : List[float] = []
+        self.activate : List[bool] = []     # whether the source node fires before this connection
+
+        fired = set()
+        for i in range(self.size):
+            for j, weight, enabled in out_connections[i]:
+                if not enabled or j is None or j <= i or self.layers[j] == 0:
+                    continue
+
+                self.src.append(i)
+                self.dst.append(j)
+                self.weight.append(weight)
+                self.activate.append(self.layers[i] != 0 and i not in fired)
+                fired.add(i)
+
+        # outputs that still have to fire once every connection has been delivered
+        self.output_activate = [self.layers[o] != 0 and o not in fired for o in self.outputs]
+
+    @classmethod
+    def from_genome(cls, genome : Genome) -> CompiledNetwork:
+        """Compiles genome.network, which generate_network must have just built"""
+        return cls(genome.network, [n.layer for n in genome.network],
+                   [genome.nodes[i] for i in range(genome.inputs)], genome.nodes[genome.bias_node],
+                   [genome.nodes[genome.inputs + i] for i in range(genome.outputs)],
+                   [(conn.from_node, conn.to_node, conn.weight, conn.enabled) for conn in genome.genes])
+
+    @classmethod
+    def from_arrays(cls, size : int, inputs : List[int], bias : int, outputs : List[int], layers : List[int],
+                    src : List[int], dst : List[int], weight : List[float], activate : List[bool],
+                    output_activate : List[bool]) -> CompiledNetwork:
+        """Rebuilds a network from the arrays of one compiled earlier, without compiling again"""
+        net = cls.__new__(cls)
+        net.size = size
+        net.inputs = inputs
+        net.bias = bias
+        net.outputs = outputs
+        net.layers = layers
+        net.src = src
+        net.dst = dst
+        net.weight = weight
+        net.activate = activate
+        net.output_activate = output_activate
+        return net
+
+    def feedforward(self, input_vals) -> List[float]:
+        values = [0] * self.size
+        sums = [0] * self.size
+        for i, pos in enumerate(self.inputs):
+            values[pos] = input_vals[i]
+        values[self.bias] = 1
+
+        for s, d, w, act in zip(self.src, self.dst, self.weight, self.activate):
+            if act:
+                values[s] = 1. / (1 + math.exp(-sums[s]))
+            sums[d] += w * values[s]
+
+        outputs = []
+        for o, act in zip(self.outputs, self.output_activate):
+            if act:
+                values[o] = 1. / (1 + math.exp(-sums[o]))
+            outputs.append(values[o])
+        return outputs
@@ -7,6 +7,9 @@ if TYPE_CHECKING:
 
 class Node():
     """A node in the network."""
+
+    __slots__ = ('num', 'input_sum', 'output', 'out_connections', 'layer')
+
     def __init__(self, num) -> None:
         self.num = num
         self.input_sum = 0
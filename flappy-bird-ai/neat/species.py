@@ -1,11 +1,105 @@
 from __future__ import annotations
-from typing import List, TYPE_CHECKING
+from typing import Dict, List, Tuple, TYPE_CHECKING
+from bisect import bisect_right
+from itertools import accumulate
 import random
+import numpy as np
+
+from .compact import CompactGenome
 
 if TYPE_CHECKING:
     from ..player import Player
+    from ..pool import PlayerPool
     from .genome import Genome
-    from .connection import ConnectionHistory
+    from .connection import InnovationHistory
+
+def gene_weights(genome : Genome) -> Dict[int, float]:
+    """Returns the weight of the first gene with each innovation number"""
+    if isinstance(genome, CompactGenome):
+        weights : Dict[int, float] = {}
+        for inno, w in zip(genome.gene_inno, genome.gene_weight):
+            weights.setdefault(inno, w)
+        return weights
+    return {inno: genome.genes[i].weight for inno, i in genome.gene_index.items()}
+
+def match_genes(genome : Genome, other_weights : Dict[int, float]) -> Tuple[float, float]:
+    """
+    Returns the number of genome's genes matching a gene in other_weights and their total weight difference,
+    in one pass over genome's genes in order
+    """
+    matching = 0.0
+    total_diff = 0.0
+    if isinstance(genome, CompactGenome):
+        for inno, weight in zip(genome.gene_inno, genome.gene_weight):
+            w = other_weights.get(inno)
+            if w is not None:
+                matching += 1
+                total_diff += abs(weight - w)
+        return matching, total_diff
+
+    for conn in genome.genes:
+        w = other_weights.get(conn.innovation_num)
+        if w is not None:
+            matching += 1
+            total_diff += abs(conn.weight - w)
+    return matching, total_diff
+
+def compatibility_matrix(genomes : List[Genome], species : List[Species]) -> np.ndarray:
+    """
+    Returns the compatibility distance of every genome (rows) to every species rep (columns) in one go.\n
+    Genomes are laid out as padded rows of genes and reps as dense weight columns over the reps' innovation numbers,
+    then every weight difference is summed slot by slot so each distance comes out exactly as Species.compatibility.
+    Genomes with repeated innovation numbers go through Species.compatibility.
+    """
+    column : Dict[int, int] = {}
+    for s in species:
+        for inno in s.rep_weights:
+            column.setdefault(inno, len(column))
+
+    # one row per innovation number, the extra last row never matches, it stands for genes no rep has and for padding
+    rep_weights = np.zeros((len(column) + 1, len(species)))
+    rep_has = np.zeros((len(column) + 1, len(species)), dtype=bool)
+    for j, s in enumerate(species):
+        for inno, w in s.rep_weights.items():
+            rep_weights[column[inno], j] = w
+            rep_has[column[inno], j] = True
+
+    max_genes = max((g.gene_count for g in genomes), default=0)
+    cols = np.full((len(genomes), max_genes), len(column), dtype=np.int64)
+    weights = np.zeros((len(genomes), max_genes))
+    repeated = []
+    for i, g in enumerate(genomes):
+        innos, gene_weight = g.gene_arrays()
+        cols[i, :len(innos)] = [column.get(inno, len(column)) for inno in innos]
+        weights[i, :len(innos)] = gene_weight
+        if len(set(innos)) != len(innos):
+            repeated.append(i)
+
+    matching = np.zeros((len(genomes), len(species)))
+    total_diff = np.zeros((len(genomes), len(species)))
+    for k in range(max_genes):
+        c = cols[:, k]
+        has = rep_has[c]
+        matching += has
+        total_diff += np.where(has, np.abs(weights[:, k, None] - rep_weights[c]), 0.0)
+
+    genes = np.array([g.gene_count for g in genomes], dtype=np.float64)[:, None]
+    rep_genes = np.array([s.rep.gene_count for s in species], dtype=np.float64)
+    excess_and_disjoint = genes + rep_genes - 2 * matching
+
+    avg_weight_diff = np.full(matching.shape, 100.0)
+    np.divide(total_diff, matching, out=avg_weight_diff, where=matching != 0)
+    avg_weight_diff[genes[:, 0] == 0, :] = 0
+    avg_weight_diff[:, rep_genes == 0] = 0
+
+    excess_cof = np.array([s.excess_cof for s in species], dtype=np.float64)
+    weight_diff_cof = np.array([s.weight_diff_cof for s in species], dtype=np.float64)
+    normalizer = np.maximum(genes, 1)
+    compat = (excess_cof * excess_and_disjoint / normalizer) + (weight_diff_cof * avg_weight_diff)
+
+    for i in repeated:
+        compat[i] = [s.compatibility(genomes[i]) for s in species]
+    return compat
 
 class Species():
     def __init__(self, player : Player) -> None:
@@ -15,6 +109,8 @@ class Species():
         self.avg_fitness = 0
         self.staleness = 0
         self.rep = None
+        self.rep_weights : Dict[int, float] = {}
+        self.cum_fitness : List[float] = None         # running fitness totals for select_player
 
         self.excess_cof = 1
         self.weight_diff_cof = 0.5
@@ -23,49 +119,55 @@ class Species():
         if player != None:
             self.players.append(player)
             self.best_fitness = player.fitness
-            self.rep = player.brain.clone()
+            self.set_rep(player.brain.clone())
             self.champ = player.clone()         # might not use, if not implement replay
 
+    def set_rep(self, rep : Genome) -> None:
+        self.rep = rep
+        self.rep_weights = gene_weights(rep)
+
     def is_same_species(self, g : Genome) -> bool:
         """
         Returns whether this and param genome is in same species i.e., similar genes
         """
-        excess_and_disjoint = self.get_excess_disjoint(g, self.rep)
-        avg_weight_diff = self.avg_weight_diff(g, self.rep)
+        return self.compatibility(g) < self.compat_thresh
+
+    def compatibility(self, g : Genome) -> float:
+        """
+        Returns the compatibility distance between param genome and the rep, in one pass over the genes
+        """
+        matching, total_diff = match_genes(g, self.rep_weights)
+        excess_and_disjoint = g.gene_count + self.rep.gene_count - 2 * matching
+        if g.gene_count == 0 or self.rep.gene_count == 0:
+            avg_weight_diff = 0
+        elif matching == 0:
+            avg_weight_diff = 100
+        else:
+            avg_weight_diff = total_diff / matching
+
+        normalizer = max(g.gene_count, 1)
+        return (self.excess_cof * excess_and_disjoint / normalizer) + (self.weight_diff_cof * avg_weight_diff)    # compatibility formula
 
-        normalizer = max(len(g.genes), 1)
-        compat = (self.excess_cof * excess_and_disjoint / normalizer) + (self.weight_diff_cof * avg_weight_diff)    # compatibility formula
-        return compat < self.compat_thresh
+    def clear(self) -> None:
+        """Empties the species before players are sorted into species again"""
+        self.players = []
+        self.cum_fitness = None
 
     def get_excess_disjoint(self, brain1 : Genome, brain2 : Genome) -> float:
         """
         Returns number of excess and disjoint genes (those that don't match)
         """
-        matching = 0.0
-        for conn1 in brain1.genes:
-            for conn2 in brain2.genes:
-                if conn1.innovation_num == conn2.innovation_num:
-                    matching += 1
-                    break
-        
-        return len(brain1.genes) + len(brain2.genes) - 2 * matching
+        matching, _ = match_genes(brain1, gene_weights(brain2))
+        return brain1.gene_count + brain2.gene_count - 2 * matching
 
     def avg_weight_diff(self, brain1 : Genome, brain2 : Genome) -> float:
         """
         Returns average weight difference between matching genes in genomes
         """
-        if len(brain1.genes) == 0 or len(brain2.genes) == 0:
+        if brain1.gene_count == 0 or brain2.gene_count == 0:
             return 0
 
-        matching = 0.0
-        total_diff = 0.0
-        for conn1 in brain1.genes:
-            for conn2 in brain2.genes:
-                if conn1.innovation_num == conn2.innovation_num:
-                    matching += 1
-                    total_diff += abs(conn1.weight - conn2.weight)
-                    break
-
+        matching, total_diff = match_genes(brain1, gene_weights(brain2))
         if matching == 0:
             return 100
 
@@ -73,26 +175,14 @@ class Species():
 
     def add_to_species(self, player : Player) -> None:
         self.players.append(player)
+        self.cum_fitness = None
 
     def sort_species(self) -> None:
         """
-        Sorts players by fitness, in decreasing order
+        Sorts players by fitness, in decreasing order. Ties keep the order they were added in
         """
-        temp = []
-
-        while len(self.players) > 0:
-            max_val = 0
-            max_idx = 0
-            
-            for i, p2 in enumerate(self.players):
-                if p2.fitness > max_val:
-                    max_val = p2.fitness
-                    max_idx = i
-            
-            temp.append(self.players[max_idx])
-            del self.players[max_idx]
-
-        self.players = temp.copy()
+        self.players.sort(key=lambda p: p.fitness, reverse=True)
+        self.cum_fitness = None
         if len(self.players) == 0:
             self.staleness = 200
             return
@@ -100,54 +190,60 @@ class Species():
         if self.players[0].fitness > self.best_fitness:
             self.staleness = 0
             self.best_fitness = self.players[0].fitness
-            self.rep = self.players[0].brain.clone()
+            self.set_rep(self.players[0].brain.clone())
             self.champ = self.players[0].clone()
         else:
             self.staleness += 1
 
     def set_avg_fitness(self) -> None:
+        if len(self.players) == 0:
+            self.avg_fitness = 0    # nobody was sorted into it this generation, it is stale and gets killed
+            return
+
         total = 0
         for p in self.players:
             total += p.fitness
         
         self.avg_fitness = total / len(self.players)
 
-    def make_child(self, innovation_hist : List[ConnectionHistory]) -> Player:
+    def make_child(self, innovation_hist : InnovationHistory, pool : PlayerPool = None) -> Player:
         """
-        Makes a child from all players in this species
+        Makes a child from all players in this species, recycling a player from pool if given
         """
 
         if (random.random() < 0.25):
-            baby = self.select_player().clone()
+            baby = self.select_player().clone(pool)
         else:
             p1 = self.select_player()
             p2 = self.select_player()
 
             if p1.fitness < p2.fitness:
-                baby = p2.crossover(p1)
+                baby = p2.crossover(p1, pool)
             else:
-                baby = p1.crossover(p2)
+                baby = p1.crossover(p2, pool)
         
         baby.brain.mutate(innovation_hist)
         return baby
 
     def select_player(self) -> Player:
         """
-        Returns a player based on fitness semi-randomly
+        Returns a player based on fitness semi-randomly.\n
+        Binary searches the running fitness totals, built once by build_selection_table
         """
-        fitness_sum = 0
-        for p in self.players:
-            fitness_sum += p.fitness
+        if self.cum_fitness is None:
+            self.build_selection_table()
         
-        rand = random.random() * fitness_sum
-        running = 0
-        for p in self.players:
-            running += p.fitness
-            if running > rand:
-                return p
+        rand = random.random() * self.cum_fitness[-1]
+        i = bisect_right(self.cum_fitness, rand)
+        if i < len(self.players):
+            return self.players[i]
         
         return self.players[0]
 
+    def build_selection_table(self) -> None:
+        """Stores the running fitness totals of the players, in order, for select_player"""
+        self.cum_fitness = list(accumulate((p.fitness for p in self.players), initial=0))[1:]
+
     def cull(self) -> None:
         """
         Removes bottom half of players
@@ -155,6 +251,7 @@ class Species():
         p_len = len(self.players)
         if p_len > 2:
             self.players = self.players[:p_len // 2]
+        self.cum_fitness = None
 
     def fitness_sharing(self) -> None:
         """
@@ -162,3 +259,4 @@ class Species():
         """
         for p in self.players:
             p.fitness /= len(self.players)
+        self.cum_fitness = None
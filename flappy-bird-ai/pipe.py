@@ -1,6 +1,5 @@
 from __future__ import annotations
-from typing import List
-import pygame
+from typing import Callable, List
 import random
 
 class Pipe():
@@ -17,14 +16,16 @@ class Pipe():
         self.position = (self.position[0] - self.speed * delta_time, self.position[1])
 
     def draw(self, surface) -> None:
+        import pygame   # imported here so headless training never loads pygame
         pygame.draw.rect(surface, self.color, (self.position[0], self.position[1], self.width, self.height))
 
     def reset(self, pos) -> None:
         self.position = pos
 
 class PipePair():
-    def __init__(self, pos_x=510, width=100, height=800, color=(105, 214, 21)) -> None:
-        bottom_pos_y = random.randint(200, 520)
+    def __init__(self, pos_x=510, width=100, height=800, color=(105, 214, 21), next_gap : Callable[[], int] = None) -> None:
+        self.next_gap = next_gap if next_gap is not None else self.random_gap
+        bottom_pos_y = self.next_gap()
 
         self.gap_size = 200
         self.height = height
@@ -32,6 +33,10 @@ class PipePair():
         self.bottom_pipe = Pipe(pos_x, bottom_pos_y, width, height, color)
         self.active = False
         
+    @staticmethod
+    def random_gap() -> int:
+        return random.randint(200, 520)
+
     def start(self) -> None:
         self.active = True
 
@@ -40,12 +45,12 @@ class PipePair():
         self.bottom_pipe.update(delta_time)
 
         if self.top_pipe.position[0] + self.top_pipe.width < 0:
-            bottom_pos_y = random.randint(200, 520)
+            bottom_pos_y = self.next_gap()
             self.top_pipe.reset((self.top_pipe.init_x, bottom_pos_y - self.height - self.gap_size))
             self.bottom_pipe.reset((self.bottom_pipe.init_x, bottom_pos_y))
 
     def reset(self):
-        bottom_pos_y = random.randint(200, 520)
+        bottom_pos_y = self.next_gap()
         self.top_pipe.reset((self.top_pipe.init_x, bottom_pos_y - self.height - self.gap_size))
         self.bottom_pipe.reset((self.bottom_pipe.init_x, bottom_pos_y))
         self.active = False
@@ -1,31 +1,77 @@
 from __future__ import annotations
-from typing import List
-import os
-import pygame
+from typing import List, TYPE_CHECKING
 
 from neat.genome import Genome
 
+if TYPE_CHECKING:
+    from flock import Flock
+    from pool import PlayerPool
+    from world import Obstacles
+
+class FlockField():
+    """A player attribute that is stored in the Flock arrays while the player is bound to one"""
+
+    def __set_name__(self, owner, name) -> None:
+        self.name = name
+        self.local_name = '_' + name
+
+    def __get__(self, player, owner=None):
+        if player is None:
+            return self
+        if player.flock is None:
+            return getattr(player, self.local_name)
+        return getattr(player.flock, self.name)[player.flock_index].item()
+
+    def __set__(self, player, value) -> None:
+        if player.flock is None:
+            setattr(player, self.local_name, value)
+        else:
+            getattr(player.flock, self.name)[player.flock_index] = value
+
 class Player():
 
-    pipe_pairs = None
+    __slots__ = ('start_position', 'radius', 'color', 'max_speed', 'genome_inputs', 'genome_outputs',
+                 'flock', 'flock_index', '_position', '_velocity', '_last_pipe', '_last_input_time', '_score', '_is_alive',
+                 'fitness', 'vision', 'decision', 'unadjusted_fitness', 'lifespan', 'best_score', 'gen', 'brain')
+
+    obstacles : Obstacles = None
     gravity = 3
+    genome_class = Genome     # CompactGenome keeps every brain in typed arrays instead
 
-    def __init__(self, pos=(500 / 5 * 2, 720 / 3), radius=30.0, color=(250, 239, 32), pipes=None) -> None:
-        self.position = pos
+    velocity = FlockField()
+    last_pipe = FlockField()
+    last_input_time = FlockField()
+    score = FlockField()
+    is_alive = FlockField()
+
+    def __init__(self, pos=(500 / 5 * 2, 720 / 3), radius=30.0, color=(250, 239, 32), obstacles=None, brain : Genome = None) -> None:
+        self.start_position = pos
         self.radius = radius
         self.color = color
+        self.max_speed = 0.8
+        
+        if Player.obstacles is None:
+            Player.obstacles = obstacles
+
+        self.genome_inputs = 4
+        self.genome_outputs = 1
+        # a brain passed in saves building a default one that would only be thrown away
+        self.reset(brain if brain is not None else Player.genome_class(self.genome_inputs, self.genome_outputs))
+
+    def reset(self, brain : Genome) -> None:
+        """Puts the player back the way it was made, now with brain, so a PlayerPool can hand it out again"""
+        self.flock : Flock = None
+        self.flock_index = 0
+
+        self.position = self.start_position
         self.velocity = 0
 
         self.last_pipe = 1
         self.last_input_time = 0
-        self.max_speed = 0.8
-        
-        if Player.pipe_pairs is None:
-            Player.pipe_pairs = pipes
 
         # NEAT stuff
         self.fitness = 0
-        self.vision = []        # input for NN
+        self.vision = [0, 0, 0, 0]  # input for NN, filled in place by look
         self.decision = []      # output of NN
         self.unadjusted_fitness = None
         self.lifespan = 0
@@ -33,10 +79,34 @@ class Player():
         self.score = 0
         self.is_alive = True
         self.gen = 0
-
-        self.genome_inputs = 4
-        self.genome_outputs = 1
-        self.brain = Genome(self.genome_inputs, self.genome_outputs)
+        self.brain = brain
+
+    @property
+    def position(self):
+        if self.flock is None:
+            return self._position
+        return (self._position[0], self.flock.y[self.flock_index].item())
+
+    @position.setter
+    def position(self, pos) -> None:
+        if self.flock is None:
+            self._position = pos
+        else:
+            self._position = (pos[0], self._position[1])
+            self.flock.y[self.flock_index] = pos[1]
+
+    def bind(self, flock : Flock, index : int) -> None:
+        """Makes this player a view of bird index in flock"""
+        self.flock = flock
+        self.flock_index = index
+
+    def unbind(self) -> None:
+        """Copies this bird's state out of its flock so the player stands on its own again"""
+        if self.flock is None:
+            return
+        state = (self.position, self.velocity, self.last_pipe, self.last_input_time, self.score, self.is_alive)
+        self.flock = None
+        self.position, self.velocity, self.last_pipe, self.last_input_time, self.score, self.is_alive = state
 
     def flap(self) -> None:
         if self.is_alive and self.last_input_time > 0.15:
@@ -56,25 +126,22 @@ class Player():
             self.is_alive = False
 
         # handle collisions with pipe
-        pipe_list = []
-        for pp in self.pipe_pairs:
-            pipe_list += pp.get_pipes()
-        for i, pipe in enumerate(pipe_list):
-            collide_x = self.position[0] + self.radius > pipe.position[0] and self.position[0] - self.radius < pipe.position[0] + pipe.width
-            collide_y = self.position[1] + self.radius > pipe.position[1] and self.position[1] - self.radius < pipe.position[1] + pipe.height
-
-            if collide_x and collide_y:
-                self.is_alive = False
+        x, r = self.position[0], self.radius
+        for pair, left, right, top, top_end, bottom, bottom_end in Player.obstacles.pipes:
+            if x + r > left and x - r < right:
+                if (pos_y + r > top and pos_y - r < top_end) or (pos_y + r > bottom and pos_y - r < bottom_end):
+                    self.is_alive = False
 
             # check if past pipe and increment score
-            dist_past = (self.position[0] - self.radius) - (pipe.position[0] + pipe.width)
-            if dist_past > 0 and i // 2 != self.last_pipe:
+            dist_past = (x - r) - right
+            if dist_past > 0 and pair != self.last_pipe:
                 self.score += 1
-                self.last_pipe = i // 2
+                self.last_pipe = pair
 
         self.last_input_time += delta_time
 
     def draw(self, surface) -> None:
+        import pygame   # imported here so headless training never loads pygame
         pygame.draw.circle(surface, self.color, self.position, self.radius)
 
     # ------------------------------------------------------------------------
@@ -86,19 +153,15 @@ class Player():
             value = value / (new_range[1] - new_range[0]) + new_range[0]
             return value
 
-        self.vision = [0, 0, 0, 0]
         self.vision[0] = normalize(self.velocity, (-self.max_speed, self.max_speed), (-1, 1))
 
-        closest_pipe = Player.pipe_pairs[1 - self.last_pipe]
-
-        bottom_pipe = closest_pipe.bottom_pipe
+        pipe_x, bottom_y, top_y, top_height = Player.obstacles.sensors[self.last_pipe].tolist()
         # distance to closest pipe
-        self.vision[1] = normalize(bottom_pipe.position[0] - self.position[0], (0, 720), (1, 0))
+        self.vision[1] = normalize(pipe_x - self.position[0], (0, 720), (1, 0))
         # distance to top of bottom pipe
-        self.vision[2] = normalize(bottom_pipe.position[1] - self.position[1], (0, 720), (0, 1))
+        self.vision[2] = normalize(bottom_y - self.position[1], (0, 720), (0, 1))
         # distance to bottom of top pipe
-        top_pipe = closest_pipe.top_pipe
-        self.vision[3] = normalize(self.position[1] - top_pipe.position[1] + top_pipe.height, (0, 720), (0, 1))
+        self.vision[3] = normalize(self.position[1] - top_y + top_height, (0, 720), (0, 1))
 
     def think(self):
         self.decision = self.brain.feedforward(self.vision)
@@ -108,18 +171,22 @@ class Player():
     def calculate_fitness(self) -> None:
         self.fitness = 1 + pow(self.score, 2) + self.lifespan / 20.0
 
-    def crossover(self, other_parent : Player) -> Player:
-        child = Player()
-        child.brain = self.brain.crossover(other_parent.brain)
+    def crossover(self, other_parent : Player, pool : PlayerPool = None) -> Player:
+        if pool is None:
+            child = Player(brain=self.brain.crossover(other_parent.brain))
+        else:
+            child = pool.player(self.brain.crossover(other_parent.brain, pool.genome(self.genome_inputs, self.genome_outputs)))
         child.brain.generate_network()
         return child
 
-    def clone(self) -> Player:
+    def clone(self, pool : PlayerPool = None) -> Player:
         """
-        TODO ?
+        Returns a player with a copy of this one's brain, taken from pool if given
         """
-        clone = Player()
-        clone.brain = self.brain.clone()
+        if pool is None:
+            clone = Player(brain=self.brain.clone())
+        else:
+            clone = pool.player(self.brain.clone(pool.genome(self.genome_inputs, self.genome_outputs)))
         clone.fitness = self.fitness
         clone.brain.generate_network()
         clone.gen = self.gen
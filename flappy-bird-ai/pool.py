@@ -0,0 +1,60 @@
+"""
+Recycling of the players a generation is done with.\n
+natural_selection replaces the whole population every generation. Rather than leave the old players and their
+genomes to the garbage collector and build as many new ones, a PlayerPool takes them back and hands them out again
+as children, reset with Player.reset and Genome.clear so a recycled child is the same as a new one.
+"""
+from __future__ import annotations
+from typing import Dict, List
+
+from player import Player
+from neat.genome import Genome
+
+class PlayerPool():
+    """
+    Players and genomes waiting to be reused, with counts of how many were made and how many recycled.\n
+    Players released at the end of one natural_selection are only handed out in the next one, by which time
+    speciate has let go of them, so a player is never reused while something still looks at it.
+    """
+
+    def __init__(self) -> None:
+        self.players : List[Player] = []
+        self.genomes : List[Genome] = []
+        self.counts = dict.fromkeys(('players_created', 'players_recycled', 'genomes_created', 'genomes_recycled'), 0)
+
+    def release(self, players : List[Player]) -> None:
+        """Takes back players nothing refers to any more, along with their brains"""
+        for p in players:
+            self.genomes.append(p.brain)
+            p.brain = None
+        self.players.extend(players)
+
+    def genome(self, inputs : int, outputs : int) -> Genome:
+        """Returns an empty genome to clone or cross over into"""
+        if len(self.genomes) == 0:
+            self.counts['genomes_created'] += 1
+            return Player.genome_class(inputs, outputs, True)
+
+        self.counts['genomes_recycled'] += 1
+        g = self.genomes.pop()
+        g.clear()
+        g.inputs = inputs
+        g.outputs = outputs
+        return g
+
+    def player(self, brain : Genome) -> Player:
+        """Returns a fresh player with brain"""
+        if len(self.players) == 0:
+            self.counts['players_created'] += 1
+            return Player(brain=brain)
+
+        self.counts['players_recycled'] += 1
+        p = self.players.pop()
+        p.reset(brain)
+        return p
+
+    def take_counts(self) -> Dict[str, int]:
+        """Returns the counts so far and starts over"""
+        counts = self.counts
+        self.counts = dict.fromkeys(counts, 0)
+        return counts
@@ -1,28 +1,42 @@
 from __future__ import annotations
-from typing import List, TYPE_CHECKING
+from typing import List, Tuple, TYPE_CHECKING
 import math
+import numpy as np
 
 if TYPE_CHECKING:
-    from neat.connection import ConnectionHistory
+    from concurrent.futures import Executor
+    from scheduler import GenerationScheduler
 
 from player import Player
-from neat.species import Species
+from flock import Flock
+from pool import PlayerPool
+from stats import PhaseTimer
+from neat.batch import BatchNetwork
+from neat.connection import InnovationHistory
+from neat.species import Species, compatibility_matrix
 
 class Population():
-    def __init__(self, pop_size : int) -> None:
+    def __init__(self, pop_size : int, innovation_history : InnovationHistory = None) -> None:
         self.players : List[Player] = []
         self.best_player : Player = None
         self.best_score = 0
         self.global_best_score = 0
         self.gen = 1
-        self.innovation_history : List[ConnectionHistory] = []
+        self.innovation_history = innovation_history if innovation_history is not None else InnovationHistory()
         self.gen_players : List[Player] = []
         self.species : List[Species] = []
+        self.flock : Flock = None
+        self.brains : BatchNetwork = None
 
         self.is_mass_extinction = False
         self.is_new_stage = False
+        self.batch_speciation = True
+        self.timer = PhaseTimer(enabled=False)     # a StatsRecorder swaps in an enabled one
+        self.pool = PlayerPool()                    # None makes every child from scratch
 
         self.gens_since_new_world = 0
+        self.carried_over : List[int] = []          # positions of the champion and best player clones natural_selection kept
+        self.fitness_summary : Tuple[float, float] = (0.0, 0.0)     # best and mean fitness of the last generation flown
 
         for _ in range(pop_size):
             self.players.append(Player())
@@ -30,34 +44,119 @@ class Population():
             self.players[-1].brain.generate_network()
 
     def get_current_best(self) -> Player:
+        if self.flock is not None:
+            alive = self.flock.alive_indices()
+            return self.players[alive[0]] if len(alive) > 0 else self.players[0]
+
         for p in self.players:
             if p.is_alive:
                 return p
         return self.players[0]
 
     def update_alive(self, surface, delta_time) -> None:
-        for i, p in enumerate(self.players):
-            if p.is_alive:
-                # TODO: might add multiple steps in one update
-                p.look()
-                p.think()
-                p.update(delta_time)
+        if self.flock is None:
+            self.flock = Flock(self.players, Player.obstacles)
+            self.brains = BatchNetwork([p.brain for p in self.players])
 
-                # TODO: add selective draw to show only some of the players
-                p.draw(surface)
+        alive = self.flock.alive_indices()
+        vision = self.flock.look(alive)
+        self.flock.flap(alive[self.brains.decide(alive, vision)])
+        self.flock.step(delta_time)
 
-            if p.score > self.global_best_score:
-                self.global_best_score = p.score
+        if surface is not None:
+            for i in alive:
+                self.players[i].draw(surface)
+
+        best_score = self.flock.score.max().item()
+        if best_score > self.global_best_score:
+            self.global_best_score = best_score
+
+    def draw(self, surface, count : int = None) -> None:
+        """
+        Draws the living players, or only the count of them with the highest scores.\n
+        The highest score is drawn last so it ends up on top.
+        """
+        if self.flock is not None:
+            alive = self.flock.alive_indices()
+            scores = self.flock.score[alive]
+        else:
+            alive = np.flatnonzero([p.is_alive for p in self.players])
+            scores = np.array([self.players[i].score for i in alive], dtype=np.int64)
+
+        if count is not None and len(alive) > count:
+            alive = alive[np.argsort(-scores, kind='stable')[:count][::-1]]
+
+        for i in alive:
+            self.players[i].draw(surface)
 
     def done(self) -> bool:
         """
         Returns if players are all dead
         """
+        if self.flock is not None:
+            return self.flock.alive_count == 0
+
         for p in self.players:
             if p.is_alive:
                 return False
         return True
 
+    def stop(self) -> None:
+        """
+        Ends the generation early: the birds still flying stop where they are and count as dead,
+        so natural_selection scores them by calculate_fitness like everyone else
+        """
+        if self.flock is not None:
+            self.flock.stop()
+        else:
+            for p in self.players:
+                p.is_alive = False
+
+    def evaluate_parallel(self, executor : Executor, workers : int, seed : int, size : Tuple[int, int] = (500, 720),
+                          scheduler : GenerationScheduler = None) -> int:
+        """
+        Evaluates every living player in a process pool instead of update_alive. Each worker flies a shard of them
+        through the course seeded with seed and sends back their score, lifespan and fitness.
+        The shards are cut from all players, dead ones included, so they batch the way update_alive does.
+        Returns the simulation steps taken.\n
+        A scheduler's limits are handed to every worker: each shard stops at the step cap, once the seconds left of
+        the generation and run budgets are up, or once one of its own birds reaches the target score, and scheduler.reason
+        says why. With no limit but the step cap the results are the same as a serial run on World(size, seed).
+        """
+        from evaluation import make_shards, simulate
+
+        # players a FitnessCache already knows are dead, like update_alive they still count for the best score
+        alive = [p.is_alive for p in self.players]
+        for p, a in zip(self.players, alive):
+            if not a and p.score > self.global_best_score:
+                self.global_best_score = p.score
+
+        shards = [shard for shard in make_shards([p.brain for p in self.players], workers) if any(alive[i] for i in shard)]
+        limits = scheduler.worker_limits() if scheduler is not None else ()
+        futures = [executor.submit(simulate, [self.players[i].brain for i in shard], seed, size, *limits,
+                                   done=[j for j, i in enumerate(shard) if not alive[i]])
+                   for shard in shards]
+
+        steps = 0
+        reasons = []
+        for shard, future in zip(shards, futures):
+            results, shard_steps, reason = future.result()
+            steps = max(steps, shard_steps)
+            reasons.append(reason)
+            for i, (score, lifespan, fitness) in zip(shard, results):
+                if not alive[i]:
+                    continue
+                p = self.players[i]
+                p.score = score
+                p.lifespan = lifespan
+                p.fitness = fitness
+                p.is_alive = False
+                if score > self.global_best_score:
+                    self.global_best_score = score
+        if scheduler is not None:
+            scheduler.end_workers(reasons)
+        return steps
+
     def select_best_player(self) -> None:
         temp_best = self.species[0].players[0]
         temp_best.gen = self.gen
@@ -72,50 +171,85 @@ class Population():
         """
         Make new generation when all players are dead
         """
+        timer = self.timer
         prev_best = self.players[0]
+        if self.flock is not None:
+            self.flock.release()
+            self.flock = None
+            self.brains = None
         
         self.speciate()
+        timer.lap('speciate')
         self.calculate_fitness()
+        timer.lap('calculate_fitness')
         self.sort_species()
+        timer.lap('sort_species')
         if self.is_mass_extinction:
             self.mass_extinction()
             self.is_mass_extinction = False
+            timer.lap('mass_extinction')
 
         self.cull_species()
+        timer.lap('cull_species')
         self.select_best_player()
+        timer.lap('select_best_player')
         self.kill_species()
+        timer.lap('kill_species')
 
         avg_sum = self.get_avg_fitness_sum()
         children : List[Player] = []
+        carried_over = []
+        pool = self.pool
         for s in self.species:
-            children.append(s.champ.clone())
+            carried_over.append(len(children))
+            children.append(s.champ.clone(pool))
 
             num_children = math.floor(s.avg_fitness / avg_sum * len(self.players))
 
             for _ in range(num_children - 1):
-                children.append(s.make_child(self.innovation_history))
+                children.append(s.make_child(self.innovation_history, pool))
 
         # if not enough, then get clones from best player and best species
         if len(children) < len(self.players):
-            children.append(prev_best.clone())
+            carried_over.append(len(children))
+            children.append(prev_best.clone(pool))
 
         while len(children) < len(self.players):
-            children.append(self.species[0].make_child(self.innovation_history))
+            children.append(self.species[0].make_child(self.innovation_history, pool))
+        timer.lap('children')
 
+        # species still hold the old players until the next speciate, so the pool only hands them out after that
+        if pool is not None:
+            pool.release(self.players)
         self.players = children.copy()
+        self.carried_over = carried_over
         self.gen += 1
         for p in self.players:
             p.brain.generate_network()
+        timer.lap('generate_network')
 
     def speciate(self) -> None:
         for s in self.species:
-            s.players = []
+            s.clear()
+
+        # with batch speciation every player is compared to all existing species at once,
+        # only species made during this call are checked one at a time
+        first_match = []
+        checked = 0
+        if self.batch_speciation and len(self.species) > 0:
+            checked = len(self.species)
+            thresh = np.array([s.compat_thresh for s in self.species])
+            same = compatibility_matrix([p.brain for p in self.players], self.species) < thresh
+            first_match = np.where(same.any(axis=1), same.argmax(axis=1), -1).tolist()
 
-        for p in self.players:
+        for i, p in enumerate(self.players):
             species_found = False
+            if checked > 0 and first_match[i] != -1:
+                self.species[first_match[i]].add_to_species(p)
+                continue
 
             # look for similar species and add to it
-            for s in self.species:
+            for s in self.species[checked:]:
                 if s.is_same_species(p.brain):
                     s.add_to_species(p)
                     species_found = True
@@ -126,33 +260,26 @@ class Population():
                 self.species.append(Species(p))
 
     def calculate_fitness(self):
+        total = 0.0
+        best = 0.0
         for p in self.players:
             p.calculate_fitness()
+            total += p.fitness
+            best = max(best, p.fitness)
+        self.fitness_summary = (best, total / max(len(self.players), 1))
 
     def sort_species(self) -> None:
         for s in self.species:
             s.sort_species()
 
-        temp = []
-
-        while len(self.species) > 0:
-            max_val = 0
-            max_idx = 0
-            
-            for i, s2 in enumerate(self.species):
-                if s2.best_fitness > max_val:
-                    max_val = s2.best_fitness
-                    max_idx = i
-            
-            temp.append(self.species[max_idx])
-            del self.species[max_idx]
-
-        self.species = temp.copy()
+        # stable, so species with equal best fitness keep their order
+        self.species.sort(key=lambda s: s.best_fitness, reverse=True)
 
     def kill_species(self) -> None:
         """
         Kills species that are stale (haven't improved in 15 generations) or bad (won't give a child)
         """
+        best = next((s for s in self.species if len(s.players) > 0), None)
         i = 0
         avg_sum = self.get_avg_fitness_sum()
         while i < len(self.species):
@@ -161,6 +288,11 @@ class Population():
             else:
                 i += 1
 
+        # every species can go stale at once, e.g. when a step cap leaves the best birds on the same score,
+        # so the best one with players is kept rather than breeding from nothing
+        if len(self.species) == 0 and best is not None:
+            self.species.append(best)
+
     def cull_species(self) -> None:
         """
         Kill bottom half of each species
@@ -169,6 +301,7 @@ class Population():
             s.cull()
             s.fitness_sharing()
             s.set_avg_fitness()
+            s.build_selection_table()
 
     def mass_extinction(self) -> None:
         """
@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import Dict, List, Tuple, TYPE_CHECKING
+import pygame
+
+if TYPE_CHECKING:
+    from player import Player
+    from population import Population
+    from world import World
+
+class TextCache():
+    """
+    Rendered text surfaces, kept until the text changes.\n
+    The score and generation change a few times per generation, so almost every frame blits a cached surface.
+    """
+
+    def __init__(self, font : pygame.font.Font, color, max_entries=64) -> None:
+        self.font = font
+        self.color = color
+        self.max_entries = max_entries
+        self.surfaces : Dict[str, pygame.Surface] = {}
+
+    def render(self, text : str) -> pygame.Surface:
+        surf = self.surfaces.get(text)
+        if surf is None:
+            if len(self.surfaces) >= self.max_entries:
+                self.surfaces.clear()
+            surf = self.font.render(text, True, self.color)
+            self.surfaces[text] = surf
+        return surf
+
+class AIRenderer():
+    """
+    Draws the AI training loop.\n
+    policy picks which birds get drawn: 'all' of the living ones, the 'top' count by score, or only the 'best'
+    (Population.get_current_best). The sky is one surface made up front and the text comes from a TextCache,
+    so a frame allocates nothing.
+    """
+
+    policies = ('all', 'top', 'best')
+
+    def __init__(self, screen : pygame.Surface, size : Tuple[int, int], font : pygame.font.Font, font_size : int,
+                 background=(52, 213, 235), text_color=(255, 255, 255), policy='all', top=10) -> None:
+        if policy not in self.policies:
+            raise ValueError(f'unknown render policy {policy}, expected one of {self.policies}')
+
+        self.screen = screen
+        self.size = size
+        self.font_size = font_size
+        self.policy = policy
+        self.top = top
+        self.text = TextCache(font, text_color)
+        self.background = pygame.Surface(size).convert()
+        self.background.fill(background)
+
+    def draw(self, population : Population, world : World, label : str = None) -> None:
+        """Draws a frame, with label (e.g. the simulation speed) in the bottom left corner if given"""
+        self.screen.blit(self.background, (0, 0))
+        world.draw(self.screen)
+
+        if self.policy == 'all':
+            population.draw(self.screen)
+        elif self.policy == 'top':
+            population.draw(self.screen, self.top)
+        else:
+            population.get_current_best().draw(self.screen)
+
+        self.screen.blit(self.text.render(f'{population.global_best_score}'), (self.size[0]/2 - self.font_size/2, 5))
+        self.screen.blit(self.text.render(f'Gen: {population.gen}'), (5, 5))
+        if label is not None:
+            self.screen.blit(self.text.render(label), (5, self.size[1] - self.font_size - 5))
+        pygame.display.flip()
+
+class ManualRenderer():
+    """
+    Draws manual play, only touching the parts of the window that changed.\n
+    Every frame the areas drawn last frame are covered with the cached sky, the pipes, bird and score are drawn again
+    and only those rectangles are sent to the display.
+    The bird and pipes are drawn between their last two physics states, alpha of the way along, so motion stays smooth
+    when the frame rate and the fixed physics timestep don't line up.
+    """
+
+    def __init__(self, screen : pygame.Surface, size : Tuple[int, int], font : pygame.font.Font, font_size : int,
+                 background=(52, 213, 235), text_color=(255, 255, 255)) -> None:
+        self.screen = screen
+        self.size = size
+        self.font_size = font_size
+        self.text = TextCache(font, text_color)
+        self.background = pygame.Surface(size).convert()
+        self.background.fill(background)
+        self.dirty : List[pygame.Rect] = None     # what the last frame drew, None until the first full frame
+
+    def capture(self, player : Player, world : World) -> tuple:
+        """Returns the state draw interpolates from, call it before each physics step"""
+        return player.position[1], [pp.top_pipe.position[0] for pp in world.pipe_pairs]
+
+    def draw(self, player : Player, world : World, previous : tuple, alpha : float) -> None:
+        if self.dirty is None:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.dirty:
+                self.screen.blit(self.background, rect, rect)
+
+        prev_y, prev_xs = previous
+        drawn : List[pygame.Rect] = []
+        for pp, prev_x in zip(world.pipe_pairs, prev_xs):
+            if not pp.active:
+                continue
+            x = pp.top_pipe.position[0]
+            # a pipe that wrapped back to the right jumps instead of sweeping across the screen
+            if prev_x >= x:
+                x = prev_x + (x - prev_x) * alpha
+            for pipe in (pp.top_pipe, pp.bottom_pipe):
+                drawn.append(pygame.draw.rect(self.screen, pipe.color, (x, pipe.position[1], pipe.width, pipe.height)))
+
+        y = prev_y + (player.position[1] - prev_y) * alpha
+        drawn.append(pygame.draw.circle(self.screen, player.color, (player.position[0], y), player.radius))
+        drawn.append(self.screen.blit(self.text.render(f'{player.score}'), (self.size[0]/2 - self.font_size/2, 0)))
+
+        if self.dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dirty + drawn)
+        self.dirty = drawn
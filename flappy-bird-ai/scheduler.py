@@ -0,0 +1,96 @@
+"""
+When to cut a generation or a whole training run short.\n
+Left alone a generation only ends once every bird has crashed, and a good enough bird never does.
+A GenerationScheduler is ticked once per simulation step and says when the generation has gone on long enough.
+The caller then stops the birds still flying with Population.stop, and natural_selection scores them by
+calculate_fitness like the birds that crashed.
+"""
+from __future__ import annotations
+from typing import List, Tuple, TYPE_CHECKING
+from time import perf_counter
+
+if TYPE_CHECKING:
+    from population import Population
+
+class GenerationScheduler():
+    """
+    Limits for a generation and for the run, 0 turning a limit off:\n
+    max_steps simulation steps per generation, gen_budget and run_budget seconds of wall clock time per generation
+    and for the whole run, and target_score, which ends the generation and then the run once a bird reaches it.
+    The clock is only read every clock_every steps, so ticking costs a few comparisons.
+    reason says which limit ended the last generation or the run, None if the birds all crashed on their own.
+    """
+
+    clock_every = 256
+
+    def __init__(self, max_steps : int = 0, gen_budget : float = 0.0, run_budget : float = 0.0, target_score : int = 0) -> None:
+        self.max_steps = max_steps
+        self.gen_budget = gen_budget
+        self.run_budget = run_budget
+        self.target_score = target_score
+        self.timed = gen_budget > 0 or run_budget > 0
+
+        self.steps = 0
+        self.reason : str = None
+        self.run_start = perf_counter()
+        self.gen_start = self.run_start
+
+    def start_run(self) -> None:
+        self.run_start = perf_counter()
+        self.start_generation()
+
+    def start_generation(self) -> None:
+        self.steps = 0
+        self.reason = None
+        self.gen_start = perf_counter()
+
+    def tick(self, population : Population) -> bool:
+        """Call after every simulation step, returns whether the generation has to end now"""
+        self.steps += 1
+        if self.max_steps > 0 and self.steps >= self.max_steps:
+            self.reason = 'max_steps'
+        elif self.target_score > 0 and population.global_best_score >= self.target_score:
+            self.reason = 'target_score'
+        elif self.timed and self.steps % self.clock_every == 0:
+            now = perf_counter()
+            if self.gen_budget > 0 and now - self.gen_start >= self.gen_budget:
+                self.reason = 'gen_budget'
+            elif self.run_budget > 0 and now - self.run_start >= self.run_budget:
+                self.reason = 'run_budget'
+        return self.reason is not None
+
+    def worker_limits(self) -> Tuple[int, float, int]:
+        """
+        Returns the step cap, the seconds left of the generation and run budgets and the target score,
+        for the scheduler of a worker flying part of this generation. Call once the generation has started.
+        """
+        budget = 0.0
+        if self.timed:
+            now = perf_counter()
+            left = [b - (now - start) for b, start in ((self.gen_budget, self.gen_start), (self.run_budget, self.run_start)) if b > 0]
+            budget = max(min(left), 1e-3)   # a budget already spent still has to stop the workers straight away
+        return self.max_steps, budget, self.target_score
+
+    def end_workers(self, reasons : List[str]) -> None:
+        """
+        Sets reason from the reasons the workers' schedulers stopped their birds for.
+        A worker's budget covers both budgets, so it counts as gen_budget unless the run budget is spent.
+        """
+        for reason in ('target_score', 'gen_budget', 'max_steps'):
+            if reason in reasons:
+                self.reason = reason
+                break
+        else:
+            self.reason = None
+        if self.reason == 'gen_budget' and self.run_budget > 0 and perf_counter() - self.run_start >= self.run_budget:
+            self.reason = 'run_budget'
+
+    def run_over(self, population : Population) -> bool:
+        """Call between generations, returns whether training should stop"""
+        if self.target_score > 0 and population.global_best_score >= self.target_score:
+            self.reason = 'target_score'
+        elif self.run_budget > 0 and perf_counter() - self.run_start >= self.run_budget:
+            self.reason = 'run_budget'
+        else:
+            return False
+        return True
@@ -0,0 +1,149 @@
+"""
+Per generation timings and counts, written as one CSV or JSON lines row per generation.\n
+Population.natural_selection and the training loop mark the end of each phase on a PhaseTimer.
+A disabled timer (the default) returns straight away, so the marks cost next to nothing when nobody is recording.
+A StatsRecorder can also run cProfile and tracemalloc over a range of generations.
+"""
+from __future__ import annotations
+from typing import Dict, Tuple, TYPE_CHECKING
+from time import perf_counter
+import cProfile
+import csv
+import json
+import os
+import tracemalloc
+
+if TYPE_CHECKING:
+    from population import Population
+
+phases = ['simulation', 'speciate', 'calculate_fitness', 'sort_species', 'mass_extinction', 'cull_species',
+          'select_best_player', 'kill_species', 'children', 'generate_network']
+
+# how many players and genomes the generation's children were made from anew or recycled, see PlayerPool
+pool_counts = ['players_created', 'players_recycled', 'genomes_created', 'genomes_recycled']
+
+class PhaseTimer():
+    """Adds up the time between calls to lap under the name of the phase that just ended"""
+
+    def __init__(self, enabled=True) -> None:
+        self.enabled = enabled
+        self.times : Dict[str, float] = {}
+        self.last = 0.0
+
+    def start(self) -> None:
+        if self.enabled:
+            self.last = perf_counter()
+
+    def lap(self, name : str) -> None:
+        if not self.enabled:
+            return
+        now = perf_counter()
+        self.times[name] = self.times.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def take(self) -> Dict[str, float]:
+        """Returns the times so far and starts over"""
+        times = self.times
+        self.times = {}
+        return times
+
+class StatsRecorder():
+    """
+    Writes a row of phase times and population counts to path after every generation,
+    as CSV or, if path ends in .jsonl, JSON lines. Rows are appended to an existing file.\n
+    Generations in profile_gens (first, last) are also run under cProfile, saved to {profile_out}-gen{n}.prof,
+    and with trace_memory under tracemalloc, adding the peak to the row and the top allocations to {profile_out}-gen{n}-memory.txt.
+    """
+
+    fields = ['gen', 'steps', 'best_score', 'players', 'species', 'genes', 'nodes', 'innovations'] + phases + \
+             ['total', 'peak_memory_kb'] + pool_counts
+
+    def __init__(self, path : str, profile_gens : Tuple[int, int] = None, profile_out='profile', trace_memory=False) -> None:
+        self.jsonl = path.endswith('.jsonl')
+        self.profile_gens = profile_gens
+        self.profile_out = profile_out
+        self.trace_memory = trace_memory
+        self.timer = PhaseTimer()
+        self.profiler : cProfile.Profile = None
+        self.gen_start = 0.0
+        self.counts : Dict[str, int] = {}
+
+        write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='')
+        self.writer = None
+        if not self.jsonl:
+            self.writer = csv.DictWriter(self.file, self.fields)
+            if write_header:
+                self.writer.writeheader()
+
+    def profiling(self, gen : int) -> bool:
+        return self.profile_gens is not None and self.profile_gens[0] <= gen <= self.profile_gens[1]
+
+    def begin(self, population : Population) -> None:
+        """Call before a generation is played out, the counts of its players and genomes are taken now"""
+        # natural_selection replaces the players, so by end they would be the next generation's
+        self.counts = {
+            'players': len(population.players),
+            'genes': sum(p.brain.gene_count for p in population.players),
+            'nodes': sum(p.brain.node_count for p in population.players),
+            'innovations': len(population.innovation_history),
+        }
+        population.timer = self.timer
+        self.timer.take()
+        if population.pool is not None:
+            population.pool.take_counts()
+
+        if self.profiling(population.gen):
+            if self.trace_memory:
+                tracemalloc.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+        self.gen_start = perf_counter()
+        self.timer.start()
+
+    def end(self, population : Population, gen : int, steps : int) -> None:
+        """
+        Call once natural_selection has made the next generation, gen being the one that was played out.
+        species counts the species gen's players were sorted into that lived on to breed.
+        """
+        total = perf_counter() - self.gen_start
+        times = self.timer.take()
+
+        peak = None
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(f'{self.profile_out}-gen{gen}.prof')
+            self.profiler = None
+            if tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1] // 1024
+                with open(f'{self.profile_out}-gen{gen}-memory.txt', 'w') as f:
+                    for stat in tracemalloc.take_snapshot().statistics('lineno')[:25]:
+                        f.write(f'{stat}\n')
+                tracemalloc.stop()
+
+        row = {
+            'gen': gen,
+            'steps': steps,
+            'best_score': population.global_best_score,
+            'players': self.counts['players'],
+            'species': len(population.species),
+            'genes': self.counts['genes'],
+            'nodes': self.counts['nodes'],
+            'innovations': self.counts['innovations'],
+        }
+        for phase in phases:
+            row[phase] = round(times.get(phase, 0.0), 6)
+        row['total'] = round(total, 6)
+        row['peak_memory_kb'] = peak
+        if population.pool is not None:
+            row.update(population.pool.take_counts())
+
+        if self.jsonl:
+            self.file.write(json.dumps(row) + '\n')
+        else:
+            self.writer.writerow(row)
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
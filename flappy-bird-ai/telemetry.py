@@ -0,0 +1,172 @@
+"""
+Live per-generation records for dashboards, as newline-delimited JSON on a local TCP or Unix socket.\n
+headless.py --telemetry ADDRESS listens on ADDRESS and every client that connects gets a line per generation from then on.
+ADDRESS is host:port for TCP, or unix:PATH for a Unix socket.
+Sending happens on a background thread and nothing ever waits for a client: a record that doesn't fit in the queue,
+or in a slow client's buffer, is dropped and counted in the next record's dropped field.
+
+Run as python telemetry.py ADDRESS to print the records of a run that is publishing on ADDRESS.
+"""
+from __future__ import annotations
+from typing import Dict, TYPE_CHECKING
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+if TYPE_CHECKING:
+    from population import Population
+
+
+def open_socket(address : str, listen : bool) -> socket.socket:
+    """Returns a socket listening on or connected to address"""
+    if address.startswith('unix:'):
+        path = address[len('unix:'):]
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if listen:
+            if os.path.exists(path):
+                os.unlink(path)
+            sock.bind(path)
+        else:
+            sock.connect(path)
+    else:
+        host, _, port = address.rpartition(':')
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if listen:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host or '127.0.0.1', int(port)))
+        else:
+            sock.connect((host or '127.0.0.1', int(port)))
+
+    if listen:
+        sock.listen()
+    return sock
+
+
+def generation_record(population : Population, gen : int, steps : int, elapsed : float) -> dict:
+    """
+    Returns the record for generation gen once natural_selection has bred the next one.\n
+    Fitness is that of the birds that flew gen, the genome sizes are those of the new generation.
+    """
+    best_fitness, mean_fitness = population.fitness_summary
+    genes = [p.brain.gene_count for p in population.players]
+    nodes = [p.brain.node_count for p in population.players]
+    count = max(len(population.players), 1)
+    return {
+        'time': time.time(),
+        'gen': gen,
+        'best_score': population.global_best_score,
+        'best_fitness': best_fitness,
+        'mean_fitness': mean_fitness,
+        'species': len(population.species),
+        'players': len(population.players),
+        'mean_genes': sum(genes) / count,
+        'max_genes': max(genes, default=0),
+        'mean_nodes': sum(nodes) / count,
+        'max_nodes': max(nodes, default=0),
+        'steps': steps,
+        'steps_per_sec': steps / max(elapsed, 1e-9),
+    }
+
+
+class TelemetryPublisher():
+    """
+    Listens on address and streams published records to every connected client from a daemon thread.\n
+    publish never blocks: it drops the record if max_queue records are already waiting to go out. Each client has
+    a buffer of at most max_buffer bytes, a client that can't keep up misses the records that don't fit.
+    """
+
+    def __init__(self, address : str, max_queue : int = 256, max_buffer : int = 1 << 16) -> None:
+        self.address = address
+        self.max_buffer = max_buffer
+        self.records : queue.Queue = queue.Queue(max_queue)
+        self.dropped = 0            # by publish, on the training thread
+        self.client_dropped = 0     # by the sending thread, for clients with full buffers
+        self.clients : Dict[socket.socket, bytearray] = {}
+        self.server = open_socket(address, listen=True)
+        self.server.setblocking(False)
+        self.running = True
+        self.thread = threading.Thread(target=self.serve, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def publish(self, record : dict) -> None:
+        record['dropped'] = self.dropped + self.client_dropped
+        try:
+            self.records.put_nowait(json.dumps(record).encode() + b'\n')
+        except queue.Full:
+            self.dropped += 1
+
+    def serve(self) -> None:
+        while self.running:
+            try:
+                line = self.records.get(timeout=0.1)
+            except queue.Empty:
+                line = None
+
+            self.accept()
+            for client, buffer in list(self.clients.items()):
+                if line is not None:
+                    if len(buffer) + len(line) > self.max_buffer:
+                        self.client_dropped += 1
+                    else:
+                        buffer += line
+                self.flush(client, buffer)
+
+    def accept(self) -> None:
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client.setblocking(False)
+            self.clients[client] = bytearray()
+
+    def flush(self, client : socket.socket, buffer : bytearray) -> None:
+        if len(buffer) == 0:
+            return
+        try:
+            sent = client.send(buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            del self.clients[client]
+            client.close()
+            return
+        del buffer[:sent]
+
+    def close(self) -> None:
+        """Stops the thread and closes the sockets, records still queued are dropped"""
+        self.running = False
+        self.thread.join()
+        for client in self.clients:
+            client.close()
+        self.clients = {}
+        self.server.close()
+        if self.address.startswith('unix:'):
+            path = self.address[len('unix:'):]
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print('usage: python telemetry.py ADDRESS', file=sys.stderr)
+        return 2
+
+    sock = open_socket(argv[0], listen=False)
+    try:
+        with sock.makefile('r') as lines:
+            for line in lines:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import List, Tuple
+from array import array
+from functools import lru_cache
+import random
+import numpy as np
+
+from pipe import PipePair
+
+def course_seed(seed : int, gen : int) -> int:
+    """Returns the pipe course seed for a generation of a run seeded with seed"""
+    return seed * 1000003 + gen
+
+class Course():
+    """
+    The gap heights of a seeded pipe course, drawn up front into a compact array and read by index.\n
+    Index i is the height of the i-th pipe pair placed on the course, counting the first two and every respawn.
+    The heights come from the course's own random stream, so they are the same wherever and whenever the course
+    is flown and never touch the random module evolution draws from.
+    Courses are extended by another chunk should a run ever outlast the heights drawn so far.
+    """
+
+    gap_low = 200
+    gap_high = 520
+    chunk = 1024
+
+    def __init__(self, seed : int, length : int = chunk) -> None:
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.gaps = array('h')
+        self.extend(length)
+
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def get(seed : int) -> Course:
+        """Returns the course for seed, shared by every world flying it in this process"""
+        return Course(seed)
+
+    def extend(self, length : int) -> None:
+        randint, low, high = self.rng.randint, self.gap_low, self.gap_high
+        self.gaps.extend([randint(low, high) for _ in range(length)])
+
+    def __getitem__(self, i : int) -> int:
+        if i >= len(self.gaps):
+            self.extend(max(self.chunk, i + 1 - len(self.gaps)))
+        return self.gaps[i]
+
+    def __len__(self) -> int:
+        return len(self.gaps)
+
+class Obstacles():
+    """
+    The pipe course as the birds see it this tick, refreshed once by World after the pipes move.\n
+    pipes holds (pair, left, right, top pipe top, top pipe bottom, bottom pipe top, bottom pipe bottom)
+    for each active pipe pair, which is everything collision and scoring need. Inactive pairs wait off to the right
+    of the birds, so leaving them out changes nothing.
+    Row k of sensors is what a bird that last passed pair k looks at: the x, y and top pipe y and height of the next pair.
+    """
+
+    def __init__(self, pipe_pairs : List[PipePair]) -> None:
+        self.pipe_pairs = pipe_pairs
+        self.pipes : List[Tuple[int, float, float, float, float, float, float]] = []
+        self.sensors = np.zeros((len(pipe_pairs), 4))
+        self.refresh()
+
+    def refresh(self) -> None:
+        pipes = []
+        for i, pp in enumerate(self.pipe_pairs):
+            top, bottom = pp.top_pipe, pp.bottom_pipe
+            if pp.active:
+                pipes.append((i, top.position[0], top.position[0] + top.width,
+                              top.position[1], top.position[1] + top.height,
+                              bottom.position[1], bottom.position[1] + bottom.height))
+            self.sensors[i - 1] = (bottom.position[0], bottom.position[1], top.position[1], top.height)
+        self.pipes = pipes
+
+class World():
+    """
+    The pipe course the birds fly through, stepped on a fixed timestep.\n
+    Shared by the pygame loops and headless training, so it never touches pygame itself.
+    Gap heights are read in turn from a Course. Given a seed, that is the course for the seed, so the same course
+    can be replayed anywhere. Without one the world picks a course seed from the random module once and keeps
+    flying further along that course after every reset.
+    """
+
+    delta_time = 0.0027
+
+    def __init__(self, size : Tuple[int, int] = (500, 720), seed : int = None) -> None:
+        self.size = size
+        self.course = Course.get(seed if seed is not None else random.getrandbits(32))
+        self.gap_index = 0
+        self.pipe_pairs : List[PipePair] = [PipePair(size[0], next_gap=self.next_gap),
+                                            PipePair(size[0], next_gap=self.next_gap)]
+        self.pipe_pairs[0].start()
+        self.obstacles = Obstacles(self.pipe_pairs)
+
+    def next_gap(self) -> int:
+        """Returns the gap height for the next pipe pair placed on the course"""
+        gap = self.course[self.gap_index]
+        self.gap_index += 1
+        return gap
+
+    def update(self, delta_time) -> None:
+        for pair in self.pipe_pairs:
+            if pair.active:
+                if pair.top_pipe.position[0] < self.size[0] / 2 - 50:
+                    self.pipe_pairs[1].start()
+                pair.update(delta_time)
+        self.obstacles.refresh()
+
+    def draw(self, surface) -> None:
+        for pair in self.pipe_pairs:
+            if pair.active:
+                pair.draw(surface)
+
+    def reset(self, seed : int = None) -> None:
+        """Puts the pipes back at the start of the course seeded with seed if given, else further along this one"""
+        if seed is not None:
+            self.course = Course.get(seed)
+            self.gap_index = 0
+
+        for pipe in self.pipe_pairs:
+            pipe.reset()
+        self.pipe_pairs[0].start()
+        self.obstacles.refresh()